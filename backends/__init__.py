@@ -0,0 +1,13 @@
+from backends.base import Backend
+from config import DATABASE_BACKEND, SQLITE_PATH, SUPABASE_URL, SUPABASE_KEY
+
+def criar_backend(nome=DATABASE_BACKEND):
+    """Cria o backend de armazenamento escolhido em DATABASE_BACKEND ("supabase" ou "sqlite")"""
+    # Importa só o backend usado, para o SQLite funcionar sem o pacote do Supabase instalado
+    if nome == "supabase":
+        from backends.supabase_backend import SupabaseBackend
+        return SupabaseBackend(SUPABASE_URL, SUPABASE_KEY)
+    if nome == "sqlite":
+        from backends.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(SQLITE_PATH)
+    raise ValueError(f"Backend de armazenamento desconhecido: {nome}")
@@ -0,0 +1,116 @@
+from abc import ABC, abstractmethod
+
+class Backend(ABC):
+    """
+    Operações de armazenamento usadas pelo `Database`.
+
+    Cada método corresponde a uma única ida ao banco. Caches, locks e o
+    ranking em memória ficam no `Database`; o backend só lê e grava.
+    """
+
+    async def conectar(self):
+        """Abre a conexão com o banco, se ainda não estiver aberta"""
+
+    # Usuários e saldos
+
+    @abstractmethod
+    async def registrar_usuario(self, user_id, user_name, saldo):
+        """Registra um novo usuário com o saldo inicial informado"""
+
+    @abstractmethod
+    async def get_usuario(self, user_id):
+        """Retorna id, nome e saldo do usuário ou None se ele não existir"""
+
+    @abstractmethod
+    async def listar_usuarios(self):
+        """Retorna id, nome e saldo de todos os usuários"""
+
+    @abstractmethod
+    async def get_ranking(self, limit):
+        """Retorna id, nome e saldo dos usuários com maior saldo"""
+
+    # Apostas
+
+    @abstractmethod
+    async def registrar_apostas_lote(self, apostas):
+        """Grava um lote da fila de apostas; devolve id_cliente e novo saldo (None se recusada) de cada uma"""
+
+    @abstractmethod
+    async def get_minhas_apostas(self, user_id, limit, antes_de=None):
+        """
+        Retorna até `limit` apostas do usuário com id menor que `antes_de`, da mais recente para a
+        mais antiga, com time1, time2, finalizada e vencedor da partida em `partidas`
+        """
+
+    @abstractmethod
+    async def get_apostas_partidas_ativas(self):
+        """Retorna match_id, user_id, time, valor (soma) e quantidade das apostas das partidas ativas,
+        agrupadas por partida, usuário e time"""
+
+    @abstractmethod
+    async def get_estatisticas_apostas(self, user_id):
+        """Retorna total_apostas, apostas_vencedoras e total_apostado do usuário"""
+
+    # Partidas
+
+    @abstractmethod
+    async def registrar_partida(self, time1, time2):
+        """Registra uma nova partida e retorna o ID"""
+
+    @abstractmethod
+    async def liquidar_partida(self, match_id, vencedor):
+        """
+        Finaliza a partida e paga os vencedores em uma transação.
+        Retorna user_id, ganho e saldo de cada usuário pago; falha se a partida não estiver ativa.
+        """
+
+    @abstractmethod
+    async def cancelar_partida(self, match_id):
+        """Devolve as apostas (um crédito por usuário) e apaga a partida em uma única transação.
+        Retorna user_id, reembolso e saldo de cada usuário reembolsado; falha se a partida não estiver ativa"""
+
+    @abstractmethod
+    async def get_partida(self, match_id):
+        """Retorna uma partida pelo ID ou None"""
+
+    @abstractmethod
+    async def get_partidas_ativas(self):
+        """Retorna todas as partidas não finalizadas"""
+
+    @abstractmethod
+    async def get_historico_partidas(self, limit, antes_de=None):
+        """
+        Retorna até `limit` partidas finalizadas com id menor que `antes_de`, da mais recente para a mais antiga,
+        com id, time1, time2, finalizada, vencedor e created_at
+        """
+
+    # Resgate diário
+
+    @abstractmethod
+    async def resgatar_diario(self, user_id, valor, agora):
+        """Registra o resgate e credita o valor atomicamente se o usuário ainda não resgatou
+        no dia de `agora`. Retorna o novo saldo ou None"""
+
+    # Livro-razão
+
+    @abstractmethod
+    async def checkpoint_saldos(self):
+        """Consolida os lançamentos feitos desde o último checkpoint. Retorna quantos usuários mudaram"""
+
+    @abstractmethod
+    async def verificar_saldo(self, user_id):
+        """Retorna o saldo em cache (saldo) e o recalculado pelo livro-razão (saldo_ledger), ou None"""
+
+    # Configuração dos servidores
+
+    @abstractmethod
+    async def set_command_channel(self, guild_id, channel_id):
+        """Define o canal permitido para comandos em um servidor"""
+
+    @abstractmethod
+    async def get_command_channel(self, guild_id):
+        """Retorna o canal de comandos do servidor ou None"""
+
+    @abstractmethod
+    async def listar_configuracoes(self):
+        """Retorna guild_id e command_channel de todos os servidores"""
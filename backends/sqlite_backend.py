@@ -0,0 +1,375 @@
+import asyncio
+import contextlib
+import functools
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from backends.base import Backend
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY,
+    nome TEXT,
+    saldo INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS partidas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time1 TEXT NOT NULL,
+    time2 TEXT NOT NULL,
+    finalizada INTEGER NOT NULL DEFAULT 0,
+    vencedor TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS apostas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_cliente TEXT UNIQUE,
+    user_id INTEGER NOT NULL,
+    match_id INTEGER,
+    time TEXT NOT NULL,
+    valor INTEGER NOT NULL,
+    multiplicador REAL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS resgates (
+    user_id INTEGER PRIMARY KEY,
+    ultimo_resgate TEXT,
+    total_resgatado INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS server_config (
+    guild_id INTEGER PRIMARY KEY,
+    command_channel INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS transacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    valor INTEGER NOT NULL,
+    match_id INTEGER,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS saldos_checkpoint (
+    user_id INTEGER PRIMARY KEY,
+    saldo INTEGER NOT NULL,
+    ultima_transacao INTEGER NOT NULL,
+    atualizado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS apostas_match_id_time_idx ON apostas (match_id, time);
+CREATE INDEX IF NOT EXISTS apostas_user_id_idx ON apostas (user_id);
+CREATE INDEX IF NOT EXISTS partidas_finalizada_idx ON partidas (finalizada, id);
+CREATE INDEX IF NOT EXISTS usuarios_saldo_idx ON usuarios (saldo DESC);
+CREATE INDEX IF NOT EXISTS transacoes_user_id_id_idx ON transacoes (user_id, id);
+
+-- Saldo de abertura de quem já existia antes do livro-razão
+INSERT INTO transacoes (user_id, tipo, valor)
+SELECT u.id, 'abertura', u.saldo
+FROM usuarios u
+WHERE NOT EXISTS (SELECT 1 FROM transacoes t WHERE t.user_id = u.id);
+"""
+
+def _na_thread(metodo):
+    """Executa o método na thread do banco, sem bloquear o loop de eventos"""
+    @functools.wraps(metodo)
+    async def executar(self, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, metodo, self, *args)
+    return executar
+
+def _dict(linha):
+    if linha is None:
+        return None
+    dados = dict(linha)
+    if "finalizada" in dados:
+        dados["finalizada"] = bool(dados["finalizada"])
+    return dados
+
+class SQLiteBackend(Backend):
+    """
+    Backend local em um arquivo SQLite (modo WAL).
+
+    Todas as operações rodam em uma única thread dedicada, então cada método
+    executa inteiro antes do próximo e as operações compostas usam uma
+    transação `BEGIN IMMEDIATE`.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(ESQUEMA)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    @contextlib.contextmanager
+    def _transacao(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _consultar(self, sql, parametros=()):
+        return [_dict(linha) for linha in self.conn.execute(sql, parametros).fetchall()]
+
+    def _consultar_um(self, sql, parametros=()):
+        linhas = self._consultar(sql, parametros)
+        return linhas[0] if linhas else None
+
+    def _lancar(self, user_id, tipo, valor, match_id=None):
+        """Acrescenta um lançamento ao livro-razão (na mesma transação da alteração do saldo)"""
+        self.conn.execute(
+            "INSERT INTO transacoes (user_id, tipo, valor, match_id) VALUES (?, ?, ?, ?)",
+            (user_id, tipo, valor, match_id)
+        )
+
+    def _debitar(self, user_id, valor, tipo="ajuste", match_id=None):
+        linha = self._consultar_um(
+            "UPDATE usuarios SET saldo = saldo - ? WHERE id = ? AND ? > 0 AND saldo >= ? RETURNING saldo",
+            (valor, user_id, valor, valor)
+        )
+        if not linha:
+            return None
+        self._lancar(user_id, tipo, -valor, match_id)
+        return linha["saldo"]
+
+    def _creditar(self, user_id, valor, tipo="ajuste", match_id=None):
+        linha = self._consultar_um(
+            "UPDATE usuarios SET saldo = saldo + ? WHERE id = ? RETURNING saldo", (valor, user_id)
+        )
+        if not linha:
+            return None
+        if valor:
+            self._lancar(user_id, tipo, valor, match_id)
+        return linha["saldo"]
+
+    def _inserir_aposta(self, user_id, match_id, time, valor, multiplicador, id_cliente=None):
+        self.conn.execute(
+            "INSERT INTO apostas (id_cliente, user_id, match_id, time, valor, multiplicador) VALUES (?, ?, ?, ?, ?, ?)",
+            (id_cliente, user_id, match_id, time, valor, multiplicador)
+        )
+
+    # Usuários e saldos
+
+    @_na_thread
+    def registrar_usuario(self, user_id, user_name, saldo):
+        with self._transacao():
+            self.conn.execute("INSERT INTO usuarios (id, nome, saldo) VALUES (?, ?, ?)", (user_id, user_name, saldo))
+            if saldo:
+                self._lancar(user_id, "registro", saldo)
+
+    @_na_thread
+    def get_usuario(self, user_id):
+        return self._consultar_um("SELECT id, nome, saldo FROM usuarios WHERE id = ?", (user_id,))
+
+    @_na_thread
+    def listar_usuarios(self):
+        return self._consultar("SELECT id, nome, saldo FROM usuarios")
+
+    @_na_thread
+    def get_ranking(self, limit):
+        return self._consultar("SELECT id, nome, saldo FROM usuarios ORDER BY saldo DESC LIMIT ?", (limit,))
+
+    # Apostas
+
+    @_na_thread
+    def registrar_apostas_lote(self, apostas):
+        resultados = []
+        with self._transacao():
+            for aposta in apostas:
+                if self._consultar_um("SELECT 1 FROM apostas WHERE id_cliente = ?", (aposta["id_cliente"],)):
+                    saldo = self._consultar_um("SELECT saldo FROM usuarios WHERE id = ?", (aposta["user_id"],))["saldo"]
+                elif not self._consultar_um(
+                    "SELECT 1 FROM partidas WHERE id = ? AND NOT finalizada", (aposta["match_id"],)
+                ):
+                    saldo = None
+                else:
+                    saldo = self._debitar(aposta["user_id"], aposta["valor"], "aposta", aposta["match_id"])
+                    if saldo is not None:
+                        self._inserir_aposta(
+                            aposta["user_id"], aposta["match_id"], aposta["time"],
+                            aposta["valor"], aposta["multiplicador"], aposta["id_cliente"]
+                        )
+                resultados.append({"id_cliente": aposta["id_cliente"], "saldo": saldo})
+        return resultados
+
+    @_na_thread
+    def get_minhas_apostas(self, user_id, limit, antes_de=None):
+        apostas = []
+        for aposta in self._consultar("""
+            SELECT a.id, a.match_id, a.time, a.valor, a.multiplicador,
+                   p.id AS partida_id, p.time1, p.time2, p.finalizada, p.vencedor
+            FROM apostas a
+            LEFT JOIN partidas p ON p.id = a.match_id
+            WHERE a.user_id = ? AND (? IS NULL OR a.id < ?)
+            ORDER BY a.id DESC
+            LIMIT ?
+        """, (user_id, antes_de, antes_de, limit)):
+            partida = {campo: aposta.pop(campo) for campo in ("time1", "time2", "finalizada", "vencedor")}
+            aposta["partidas"] = partida if aposta.pop("partida_id") is not None else None
+            apostas.append(aposta)
+        return apostas
+
+    @_na_thread
+    def get_apostas_partidas_ativas(self):
+        return self._consultar("""
+            SELECT a.match_id, a.user_id, a.time, SUM(a.valor) AS valor, COUNT(*) AS quantidade
+            FROM apostas a
+            JOIN partidas p ON p.id = a.match_id
+            WHERE NOT p.finalizada
+            GROUP BY a.match_id, a.user_id, a.time
+        """)
+
+    @_na_thread
+    def get_estatisticas_apostas(self, user_id):
+        return self._consultar_um("""
+            SELECT COUNT(*) AS total_apostas,
+                   COUNT(CASE WHEN p.finalizada AND p.vencedor = a.time THEN 1 END) AS apostas_vencedoras,
+                   COALESCE(SUM(a.valor), 0) AS total_apostado
+            FROM apostas a
+            LEFT JOIN partidas p ON p.id = a.match_id
+            WHERE a.user_id = ?
+        """, (user_id,))
+
+    # Partidas
+
+    @_na_thread
+    def registrar_partida(self, time1, time2):
+        return self._consultar_um(
+            "INSERT INTO partidas (time1, time2) VALUES (?, ?) RETURNING id", (time1, time2)
+        )["id"]
+
+    @_na_thread
+    def liquidar_partida(self, match_id, vencedor):
+        with self._transacao():
+            if not self._consultar_um("SELECT 1 FROM partidas WHERE id = ? AND NOT finalizada", (match_id,)):
+                raise ValueError(f"Partida {match_id} não encontrada ou já finalizada")
+
+            self.conn.execute("UPDATE partidas SET finalizada = 1, vencedor = ? WHERE id = ?", (vencedor, match_id))
+            pagamentos = self._consultar("""
+                SELECT user_id, SUM(CAST(valor * multiplicador AS INTEGER)) AS ganho
+                FROM apostas
+                WHERE match_id = ? AND time = ?
+                GROUP BY user_id
+            """, (match_id, vencedor))
+            for pagamento in pagamentos:
+                pagamento["saldo"] = self._creditar(pagamento["user_id"], pagamento["ganho"], "pagamento", match_id)
+        return pagamentos
+
+    @_na_thread
+    def cancelar_partida(self, match_id):
+        with self._transacao():
+            if not self._consultar_um("SELECT 1 FROM partidas WHERE id = ? AND NOT finalizada", (match_id,)):
+                raise ValueError(f"Partida {match_id} não encontrada ou já finalizada")
+
+            reembolsos = self._consultar("""
+                SELECT user_id, SUM(valor) AS reembolso
+                FROM apostas
+                WHERE match_id = ?
+                GROUP BY user_id
+            """, (match_id,))
+            for reembolso in reembolsos:
+                reembolso["saldo"] = self._creditar(reembolso["user_id"], reembolso["reembolso"], "reembolso", match_id)
+
+            self.conn.execute("DELETE FROM apostas WHERE match_id = ?", (match_id,))
+            self.conn.execute("DELETE FROM partidas WHERE id = ?", (match_id,))
+        return reembolsos
+
+    @_na_thread
+    def get_partida(self, match_id):
+        return self._consultar_um("SELECT * FROM partidas WHERE id = ?", (match_id,))
+
+    @_na_thread
+    def get_partidas_ativas(self):
+        return self._consultar("SELECT * FROM partidas WHERE NOT finalizada")
+
+    @_na_thread
+    def get_historico_partidas(self, limit, antes_de=None):
+        return self._consultar("""
+            SELECT id, time1, time2, finalizada, vencedor, created_at
+            FROM partidas
+            WHERE finalizada AND (? IS NULL OR id < ?)
+            ORDER BY id DESC
+            LIMIT ?
+        """, (antes_de, antes_de, limit))
+
+    # Resgate diário
+
+    @_na_thread
+    def resgatar_diario(self, user_id, valor, agora):
+        with self._transacao():
+            if not self._consultar_um("SELECT 1 FROM usuarios WHERE id = ?", (user_id,)):
+                return None
+            # O WHERE do upsert faz a checagem do dia e a marcação no mesmo comando
+            cursor = self.conn.execute("""
+                INSERT INTO resgates (user_id, ultimo_resgate, total_resgatado) VALUES (?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    ultimo_resgate = excluded.ultimo_resgate,
+                    total_resgatado = total_resgatado + excluded.total_resgatado
+                WHERE resgates.ultimo_resgate IS NULL
+                   OR date(resgates.ultimo_resgate) < date(excluded.ultimo_resgate)
+            """, (user_id, agora.isoformat(), valor))
+            if not cursor.rowcount:
+                return None
+            return self._creditar(user_id, valor, "resgate")
+
+    # Livro-razão
+
+    @_na_thread
+    def checkpoint_saldos(self):
+        with self._transacao():
+            desde = self._consultar_um(
+                "SELECT COALESCE(MAX(ultima_transacao), 0) AS id FROM saldos_checkpoint"
+            )["id"]
+            ate = self._consultar_um("SELECT COALESCE(MAX(id), ?) AS id FROM transacoes", (desde,))["id"]
+            return self.conn.execute("""
+                INSERT INTO saldos_checkpoint (user_id, saldo, ultima_transacao)
+                SELECT user_id, SUM(valor), ?
+                FROM transacoes
+                WHERE id > ? AND id <= ?
+                GROUP BY user_id
+                ON CONFLICT (user_id) DO UPDATE SET
+                    saldo = saldo + excluded.saldo,
+                    ultima_transacao = excluded.ultima_transacao,
+                    atualizado_em = CURRENT_TIMESTAMP
+            """, (ate, desde, ate)).rowcount
+
+    @_na_thread
+    def verificar_saldo(self, user_id):
+        return self._consultar_um("""
+            SELECT u.saldo,
+                   COALESCE(c.saldo, 0) + COALESCE((
+                       SELECT SUM(t.valor)
+                       FROM transacoes t
+                       WHERE t.user_id = u.id AND t.id > COALESCE(c.ultima_transacao, 0)
+                   ), 0) AS saldo_ledger
+            FROM usuarios u
+            LEFT JOIN saldos_checkpoint c ON c.user_id = u.id
+            WHERE u.id = ?
+        """, (user_id,))
+
+    # Configuração dos servidores
+
+    @_na_thread
+    def set_command_channel(self, guild_id, channel_id):
+        self.conn.execute("""
+            INSERT INTO server_config (guild_id, command_channel) VALUES (?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET command_channel = excluded.command_channel
+        """, (guild_id, channel_id))
+
+    @_na_thread
+    def get_command_channel(self, guild_id):
+        linha = self._consultar_um("SELECT command_channel FROM server_config WHERE guild_id = ?", (guild_id,))
+        return linha["command_channel"] if linha else None
+
+    @_na_thread
+    def listar_configuracoes(self):
+        return self._consultar("SELECT guild_id, command_channel FROM server_config")
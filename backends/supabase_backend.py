@@ -0,0 +1,141 @@
+import asyncio
+import supabase
+from backends.base import Backend
+
+class SupabaseBackend(Backend):
+    """Backend hospedado no Supabase, usando o cliente assíncrono (conexões HTTP reaproveitadas)"""
+
+    def __init__(self, url, key):
+        self.url = url
+        self.key = key
+        self.sb = None
+        self._conexao_lock = asyncio.Lock()
+
+    async def conectar(self):
+        """Cria o cliente assíncrono do Supabase na primeira chamada e o reaproveita."""
+        if self.sb is None:
+            async with self._conexao_lock:
+                if self.sb is None:
+                    self.sb = await supabase.acreate_client(self.url, self.key)
+        return self.sb
+
+    async def registrar_usuario(self, user_id, user_name, saldo):
+        sb = await self.conectar()
+        await sb.table("usuarios").insert({"id": user_id, "nome": user_name, "saldo": saldo}).execute()
+
+    async def get_usuario(self, user_id):
+        sb = await self.conectar()
+        user = await sb.table("usuarios").select("id, nome, saldo").eq("id", user_id).execute()
+        return user.data[0] if user.data else None
+
+    async def listar_usuarios(self, tamanho_pagina=1000):
+        sb = await self.conectar()
+        usuarios = []
+        while True:
+            pagina = (await sb.table("usuarios").select("id, nome, saldo").order("id")
+                      .range(len(usuarios), len(usuarios) + tamanho_pagina - 1).execute()).data
+            usuarios.extend(pagina)
+            if len(pagina) < tamanho_pagina:
+                return usuarios
+
+    async def get_ranking(self, limit):
+        sb = await self.conectar()
+        return (await sb.table("usuarios").select("id, nome, saldo").order("saldo", desc=True).limit(limit).execute()).data
+
+    async def registrar_apostas_lote(self, apostas):
+        sb = await self.conectar()
+        return (await sb.rpc("registrar_apostas_lote", {"p_apostas": apostas}).execute()).data
+
+    async def get_minhas_apostas(self, user_id, limit, antes_de=None):
+        sb = await self.conectar()
+        consulta = sb.table("apostas").select(
+            "id, match_id, time, valor, multiplicador, partidas(time1, time2, finalizada, vencedor)"
+        ).eq("user_id", user_id)
+        if antes_de is not None:
+            consulta = consulta.lt("id", antes_de)
+        return (await consulta.order("id", desc=True).limit(limit).execute()).data
+
+    async def get_apostas_partidas_ativas(self):
+        sb = await self.conectar()
+        return (await sb.rpc("apostas_partidas_ativas").execute()).data
+
+    async def get_estatisticas_apostas(self, user_id):
+        sb = await self.conectar()
+        stats = (await sb.rpc("estatisticas_apostas", {"p_user_id": user_id}).execute()).data
+        stats = stats[0] if stats else {}
+
+        return {
+            'total_apostas': stats.get('total_apostas') or 0,
+            'apostas_vencedoras': stats.get('apostas_vencedoras') or 0,
+            'total_apostado': stats.get('total_apostado') or 0
+        }
+
+    async def registrar_partida(self, time1, time2):
+        sb = await self.conectar()
+        partida = await sb.table("partidas").insert({
+            "time1": time1,
+            "time2": time2,
+            "finalizada": False,
+            "vencedor": None
+        }).execute()
+        return partida.data[0]["id"]
+
+    async def liquidar_partida(self, match_id, vencedor):
+        sb = await self.conectar()
+        return (await sb.rpc("liquidar_partida", {
+            "p_match_id": match_id,
+            "p_vencedor": vencedor
+        }).execute()).data
+
+    async def cancelar_partida(self, match_id):
+        sb = await self.conectar()
+        return (await sb.rpc("cancelar_partida", {"p_match_id": match_id}).execute()).data
+
+    async def get_partida(self, match_id):
+        sb = await self.conectar()
+        partida = (await sb.table("partidas").select("*").eq("id", match_id).execute()).data
+        return partida[0] if partida else None
+
+    async def get_partidas_ativas(self):
+        sb = await self.conectar()
+        return (await sb.table("partidas").select("*").eq("finalizada", False).execute()).data
+
+    async def get_historico_partidas(self, limit, antes_de=None):
+        sb = await self.conectar()
+        consulta = sb.table("partidas").select("id, time1, time2, finalizada, vencedor, created_at").eq("finalizada", True)
+        if antes_de is not None:
+            consulta = consulta.lt("id", antes_de)
+        return (await consulta.order("id", desc=True).limit(limit).execute()).data
+
+    async def resgatar_diario(self, user_id, valor, agora):
+        sb = await self.conectar()
+        return (await sb.rpc("resgatar_diario", {
+            "p_user_id": user_id,
+            "p_valor": valor,
+            "p_agora": agora.isoformat()
+        }).execute()).data
+
+    async def checkpoint_saldos(self):
+        sb = await self.conectar()
+        return (await sb.rpc("checkpoint_saldos").execute()).data
+
+    async def verificar_saldo(self, user_id):
+        sb = await self.conectar()
+        saldos = (await sb.rpc("verificar_saldo", {"p_user_id": user_id}).execute()).data
+        return saldos[0] if saldos else None
+
+    async def set_command_channel(self, guild_id, channel_id):
+        sb = await self.conectar()
+        await sb.table("server_config").upsert({
+            "guild_id": guild_id,
+            "command_channel": channel_id
+        }).execute()
+
+    async def get_command_channel(self, guild_id):
+        sb = await self.conectar()
+        config = await sb.table("server_config").select("command_channel").eq("guild_id", guild_id).execute()
+        return config.data[0]["command_channel"] if config.data else None
+
+    async def listar_configuracoes(self):
+        sb = await self.conectar()
+        return (await sb.table("server_config").select("guild_id, command_channel").execute()).data
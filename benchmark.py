@@ -0,0 +1,224 @@
+"""
+Benchmark de carga dos comandos do bot, sem Discord e sem Supabase.
+
+Chama as corrotinas dos comandos de main.py com um ctx falso. O banco é o
+backend SQLite em memória, embrulhado por um backend que conta cada ida ao
+banco (por comando e por método) e pode simular a latência de rede do Supabase.
+
+Exemplo:
+
+    python benchmark.py --usuarios 500 --partidas 3 --operacoes 5000 --latencia-ms 25
+
+Com --limite comando=N o script termina com erro se algum comando fizer, em
+média, mais de N idas ao banco — útil para pegar regressões antes do deploy.
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import importlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from tests.conftest import ContextoFalso
+
+MIX_PADRAO = "apostar=50,saldo=15,odds=15,rank=10,resgatar=5,historico=3,minhas_apostas=2"
+
+COMANDO_ATUAL = contextvars.ContextVar("comando_atual", default="(segundo plano)")
+
+class BackendGravador:
+    """Repassa as chamadas ao backend real, contando cada uma e simulando a latência de rede"""
+
+    def __init__(self, backend, latencia):
+        self._backend = backend
+        self.latencia = latencia
+        self.chamadas = Counter()
+        self.metodos = defaultdict(Counter)
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._backend, nome)
+        if nome == "conectar" or not asyncio.iscoroutinefunction(atributo):
+            return atributo
+
+        async def gravar(*args, **kwargs):
+            comando = COMANDO_ATUAL.get()
+            self.chamadas[comando] += 1
+            self.metodos[comando][nome] += 1
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+            return await atributo(*args, **kwargs)
+        return gravar
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+def ler_pares(texto, tipo):
+    pares = {}
+    for item in filter(None, texto.split(",")):
+        nome, valor = item.split("=")
+        pares[nome.strip()] = tipo(valor)
+    return pares
+
+class Benchmark:
+    def __init__(self, bot_main, args):
+        self.main = bot_main
+        self.args = args
+        self.aleatorio = random.Random(args.semente)
+        self.gravador = BackendGravador(bot_main.sb.backend, args.latencia_ms / 1000)
+        bot_main.sb.backend = self.gravador
+
+        self.latencias = defaultdict(list)
+        self.erros = Counter()
+        self.execucoes = Counter()
+
+        mix = ler_pares(args.mix, int)
+        self.comandos_mix = list(mix)
+        self.pesos_mix = list(mix.values())
+
+    def contexto(self, user_id, administrador=False):
+        return ContextoFalso(user_id, self.main.SERVER_ID, administrador)
+
+    async def executar(self, nome, ctx, *args):
+        token = COMANDO_ATUAL.set(nome)
+        inicio = time.perf_counter()
+        try:
+            if await self.main.global_check(ctx) and await self.main.channel_check(ctx):
+                await getattr(self.main, nome).callback(ctx, *args)
+        except Exception as e:
+            self.erros[nome] += 1
+            if self.args.verbose:
+                print(f"Erro em {nome}: {e!r}", file=sys.__stderr__)
+        finally:
+            self.latencias[nome].append(time.perf_counter() - inicio)
+            self.execucoes[nome] += 1
+            COMANDO_ATUAL.reset(token)
+
+    def argumentos(self, nome):
+        if nome != "apostar":
+            return ()
+        ativas = [match_id for match_id, partida in self.main.matches.items() if not partida.finalizado]
+        if not ativas:
+            return None
+        partida = self.main.matches[self.aleatorio.choice(ativas)]
+        time_escolhido = self.aleatorio.choice([partida.time1, partida.time2])
+        # Metade das apostas informa o ID da partida; a outra metade é roteada pelo time
+        match_id = partida.id if self.aleatorio.random() < 0.5 else None
+        return match_id, time_escolhido, self.aleatorio.randint(10, 200)
+
+    async def trabalhador(self, fila):
+        while True:
+            try:
+                nome, user_id = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            argumentos = self.argumentos(nome)
+            if argumentos is not None:
+                await self.executar(nome, self.contexto(user_id), *argumentos)
+
+    async def rodar(self):
+        args = self.args
+        admin = 1
+        usuarios = range(2, args.usuarios + 2)
+
+        await self.main.on_ready()
+        self.gravador.chamadas["(inicialização)"] = self.gravador.chamadas.pop("(segundo plano)", 0)
+        self.gravador.metodos["(inicialização)"] = self.gravador.metodos.pop("(segundo plano)", Counter())
+
+        for user_id in usuarios:
+            await self.executar("registrar", self.contexto(user_id))
+        for numero in range(args.partidas):
+            await self.executar("iniciar_partida", self.contexto(admin, True), f"TimeA{numero}", f"TimeB{numero}")
+
+        fila = asyncio.Queue()
+        for _ in range(args.operacoes):
+            nome = self.aleatorio.choices(self.comandos_mix, self.pesos_mix)[0]
+            fila.put_nowait((nome, self.aleatorio.choice(usuarios)))
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(self.trabalhador(fila) for _ in range(args.concorrencia)))
+        self.duracao = time.perf_counter() - inicio
+
+        for match_id, partida in list(self.main.matches.items()):
+            if not partida.finalizado:
+                vencedor = self.aleatorio.choice([partida.time1, partida.time2])
+                await self.executar("finalizar_partida", self.contexto(admin, True), match_id, vencedor)
+        # A liquidação roda em segundo plano; o benchmark só termina depois dela
+        await self.main.tarefas.aguardar()
+
+    def relatorio(self):
+        args = self.args
+        total = sum(self.execucoes[nome] for nome in self.comandos_mix)
+        print(
+            f"\n{args.usuarios} usuários, {args.partidas} partidas, {total} comandos do mix "
+            f"em {self.duracao:.2f}s ({total / self.duracao:.1f} cmd/s), "
+            f"concorrência {args.concorrencia}, latência simulada {args.latencia_ms} ms\n"
+        )
+        print(f"{'comando':<18}{'n':>7}{'cmd/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'erros':>7}{'db/cmd':>8}")
+        for nome in sorted(self.execucoes, key=lambda nome: -self.execucoes[nome]):
+            latencias = [latencia * 1000 for latencia in self.latencias[nome]]
+            vazao = self.execucoes[nome] / self.duracao if nome in self.comandos_mix else float("nan")
+            print(
+                f"{nome:<18}{self.execucoes[nome]:>7}{vazao:>9.1f}"
+                f"{percentil(latencias, 50):>9.1f}{percentil(latencias, 95):>9.1f}{percentil(latencias, 99):>9.1f}"
+                f"{self.erros[nome]:>7}{self.consultas_por_comando(nome):>8.2f}"
+            )
+        for nome in ("(inicialização)", "(segundo plano)"):
+            print(f"{nome:<18}{'':>52}{self.gravador.chamadas[nome]:>8} idas ao banco")
+
+        if args.detalhes:
+            print("\nIdas ao banco por método:")
+            for nome in sorted(self.gravador.metodos):
+                metodos = ", ".join(f"{metodo}={n}" for metodo, n in self.gravador.metodos[nome].most_common())
+                print(f"  {nome}: {metodos}")
+
+    def consultas_por_comando(self, nome):
+        return self.gravador.chamadas[nome] / self.execucoes[nome] if self.execucoes[nome] else 0
+
+    def verificar_limites(self):
+        estourados = [
+            f"{nome}: {self.consultas_por_comando(nome):.2f} idas ao banco por comando (limite {limite})"
+            for nome, limite in ler_pares(self.args.limite, float).items()
+            if self.consultas_por_comando(nome) > limite
+        ]
+        for mensagem in estourados:
+            print(f"LIMITE EXCEDIDO - {mensagem}")
+        return not estourados
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark offline dos comandos do bot")
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--partidas", type=int, default=2)
+    parser.add_argument("--operacoes", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=50, help="comandos executados ao mesmo tempo")
+    parser.add_argument("--latencia-ms", type=float, default=0, help="atraso simulado em cada ida ao banco")
+    parser.add_argument("--mix", default=MIX_PADRAO, help="pesos dos comandos, ex.: apostar=50,saldo=20")
+    parser.add_argument("--limite", default="", help="máximo de idas ao banco por comando, ex.: apostar=1,odds=1")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--detalhes", action="store_true", help="mostra as idas ao banco por método")
+    parser.add_argument("--verbose", action="store_true", help="mostra as exceções dos comandos")
+    return parser.parse_args()
+
+async def principal(args):
+    with tempfile.TemporaryDirectory() as pasta:
+        os.environ["DATABASE_BACKEND"] = "sqlite"
+        os.environ["SQLITE_PATH"] = ":memory:"
+        os.environ["JOURNAL_PATH"] = os.path.join(pasta, "journal.db")
+        os.environ["TAREFAS_PATH"] = os.path.join(pasta, "tarefas.db")
+        bot_main = importlib.import_module("main")
+
+        benchmark = Benchmark(bot_main, args)
+        # Os comandos fazem print a cada chamada; a saída deles não interessa aqui
+        with contextlib.redirect_stdout(io.StringIO()):
+            await benchmark.rodar()
+        benchmark.relatorio()
+        return benchmark.verificar_limites()
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(principal(ler_argumentos())) else 1)
@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+
+# Marca de "não está no cache", já que None também é um valor que pode ser guardado
+AUSENTE = object()
+
+class CacheTTL:
+    """Cache LRU com no máximo `tamanho_maximo` entradas, cada uma válida por `ttl` segundos"""
+
+    def __init__(self, tamanho_maximo, ttl):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._dados = OrderedDict()
+
+    def get(self, chave):
+        item = self._dados.get(chave, AUSENTE)
+        if item is AUSENTE:
+            return AUSENTE
+
+        valor, expira_em = item
+        if self.ttl and time.monotonic() >= expira_em:
+            del self._dados[chave]
+            return AUSENTE
+        self._dados.move_to_end(chave)
+        return valor
+
+    def set(self, chave, valor):
+        self._dados[chave] = (valor, time.monotonic() + self.ttl)
+        self._dados.move_to_end(chave)
+        if len(self._dados) > self.tamanho_maximo:
+            self._dados.popitem(last=False)
+
+    def remover(self, chave):
+        self._dados.pop(chave, None)
+
+    def __len__(self):
+        return len(self._dados)
+
+class Coalescedor:
+    """
+    Junta leituras idênticas simultâneas em uma única consulta (single-flight) e, se
+    `janela` > 0, reaproveita o resultado por `janela` segundos.
+    """
+
+    def __init__(self, janela=0, tamanho_maximo=1000):
+        self._em_andamento = {}
+        self._recentes = CacheTTL(tamanho_maximo, janela) if janela else None
+
+    async def executar(self, chave, funcao, *args):
+        if self._recentes is not None:
+            resultado = self._recentes.get(chave)
+            if resultado is not AUSENTE:
+                return resultado
+
+        futuro = self._em_andamento.get(chave)
+        if futuro is None:
+            futuro = asyncio.ensure_future(funcao(*args))
+            self._em_andamento[chave] = futuro
+            futuro.add_done_callback(functools.partial(self._concluir, chave))
+        # Se quem disparou a consulta for cancelado, os demais continuam esperando por ela
+        return await asyncio.shield(futuro)
+
+    def _concluir(self, chave, futuro):
+        if self._em_andamento.get(chave) is not futuro:
+            return
+        del self._em_andamento[chave]
+        if self._recentes is not None and not futuro.cancelled() and futuro.exception() is None:
+            self._recentes.set(chave, futuro.result())
+
+    def limpar(self):
+        """Descarta resultados guardados e faz as próximas leituras irem ao banco de novo"""
+        self._em_andamento.clear()
+        if self._recentes is not None:
+            self._recentes = CacheTTL(self._recentes.tamanho_maximo, self._recentes.ttl)
@@ -7,3 +7,42 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
+
+# Segundos até o canal de comandos em cache ser relido do Supabase (0 = nunca expira)
+CONFIG_CACHE_TTL = int(os.getenv("CONFIG_CACHE_TTL", "0"))
+
+# Journal local das apostas aceitas que ainda não foram gravadas no Supabase
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "apostas_pendentes.db")
+# Quantidade máxima de apostas por envio e intervalo (em segundos) entre envios
+FILA_TAMANHO_LOTE = int(os.getenv("FILA_TAMANHO_LOTE", "200"))
+FILA_INTERVALO = float(os.getenv("FILA_INTERVALO", "1.0"))
+
+# Onde os dados ficam: "supabase" (hospedado) ou "sqlite" (arquivo local em SQLITE_PATH)
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "botcc.db")
+
+# Porta do endpoint HTTP /metrics (0 = desligado) e limite para registrar chamadas lentas
+METRICAS_PORTA = int(os.getenv("METRICAS_PORTA", "0"))
+LENTIDAO_MS = float(os.getenv("LENTIDAO_MS", "500"))
+
+# Quantas partidas finalizadas mais recentes ficam em memória para o !historico e get_partida
+HISTORICO_TAMANHO = int(os.getenv("HISTORICO_TAMANHO", "500"))
+
+# Cache de usuários (existência, nome e saldo): máximo de entradas e validade em segundos
+USUARIOS_CACHE_TAMANHO = int(os.getenv("USUARIOS_CACHE_TAMANHO", "10000"))
+USUARIOS_CACHE_TTL = float(os.getenv("USUARIOS_CACHE_TTL", "300"))
+
+# Por quantos segundos o resultado de uma leitura coalescida (!odds, !saldo...) é reaproveitado; 0 desliga
+LEITURAS_JANELA = float(os.getenv("LEITURAS_JANELA", "1"))
+
+# Intervalo (segundos) entre checkpoints do livro-razão de saldos; 0 desliga
+CHECKPOINT_INTERVALO = float(os.getenv("CHECKPOINT_INTERVALO", "3600"))
+
+# Ritmo das mensagens do bot: limite global por segundo e rajada por canal a cada janela (segundos)
+MENSAGENS_POR_SEGUNDO = float(os.getenv("MENSAGENS_POR_SEGUNDO", "40"))
+MENSAGENS_POR_CANAL = float(os.getenv("MENSAGENS_POR_CANAL", "5"))
+MENSAGENS_JANELA_CANAL = float(os.getenv("MENSAGENS_JANELA_CANAL", "5"))
+
+# Arquivo das liquidações/cancelamentos pendentes e quantos rodam ao mesmo tempo
+TAREFAS_PATH = os.getenv("TAREFAS_PATH", "tarefas_pendentes.db")
+TAREFAS_CONCORRENCIA = int(os.getenv("TAREFAS_CONCORRENCIA", "2"))
@@ -1,207 +1,266 @@
+import asyncio
 import datetime
-import supabase
-from config import SUPABASE_URL, SUPABASE_KEY
+import time
+from backends import criar_backend
+from cache import AUSENTE, CacheTTL, Coalescedor
+from config import CHECKPOINT_INTERVALO, CONFIG_CACHE_TTL, LEITURAS_JANELA, USUARIOS_CACHE_TAMANHO, USUARIOS_CACHE_TTL
+from historico import HistoricoPartidas
+from metricas import BackendInstrumentado, metricas
+from ranking import Ranking
+
+# Quantidade de locks entre os quais os usuários são distribuídos
+LOCKS_USUARIOS = 64
 
 class Database:
-    def __init__(self):
-        self.sb = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
+    def __init__(self, backend=None):
+        self.backend = BackendInstrumentado(backend or criar_backend(), metricas)
+        # guild_id -> (canal de comandos, instante em que foi lido)
+        self._canais_comando = {}
+        self._locks_usuarios = [asyncio.Lock() for _ in range(LOCKS_USUARIOS)]
+        self.ranking = Ranking()
+        self.historico = HistoricoPartidas()
+        # user_id -> {id, nome, saldo}, ou None para quem não está registrado
+        self._usuarios = CacheTTL(USUARIOS_CACHE_TAMANHO, USUARIOS_CACHE_TTL)
+        # Leituras repetidas em rajadas (!odds, !saldo...) compartilham a mesma consulta
+        self._leituras = Coalescedor(LEITURAS_JANELA)
+        self._leituras_usuarios = Coalescedor()
+        # user_id -> leitura do usuário em andamento no banco (ver _get_usuario)
+        self._lendo_usuarios = {}
+        self._tarefa_checkpoint = None
+
+        metricas.registrar_medidor("usuarios_em_cache", lambda: len(self._usuarios))
+        metricas.registrar_medidor("usuarios_no_ranking", lambda: len(self.ranking))
+        metricas.registrar_medidor("partidas_no_historico", lambda: len(self.historico))
+
+    def lock_usuario(self, user_id):
+        """Lock que serializa, dentro do bot, as operações de saldo de um mesmo usuário"""
+        return self._locks_usuarios[user_id % LOCKS_USUARIOS]
+
+    async def _get_usuario(self, user_id):
+        usuario = self._usuarios.get(user_id)
+        if usuario is not AUSENTE:
+            return usuario
+
+        # {"leitores": n, "saldo": último saldo alterado enquanto a leitura estava em andamento}
+        leitura = self._lendo_usuarios.setdefault(user_id, {"leitores": 0, "saldo": None})
+        leitura["leitores"] += 1
+        try:
+            usuario = await self._leituras_usuarios.executar(user_id, self.backend.get_usuario, user_id)
+        finally:
+            leitura["leitores"] -= 1
+            if not leitura["leitores"]:
+                self._lendo_usuarios.pop(user_id, None)
+
+        # Se o saldo mudou enquanto a leitura estava em andamento, o valor lido pode ser anterior à mudança
+        atual = self._usuarios.get(user_id)
+        if atual is not AUSENTE:
+            return atual
+        if usuario is not None and leitura["saldo"] is not None:
+            usuario = {**usuario, "saldo": leitura["saldo"]}
+        self._usuarios.set(user_id, usuario)
+        return usuario
 
-    def usuario_existe(self, user_id):
+    def _saldo_alterado(self, user_id, saldo, nome=None):
+        """Propaga um saldo devolvido pelo banco para o cache de usuários e para o ranking"""
+        if saldo is None:
+            return
+
+        usuario = self._usuarios.get(user_id)
+        if usuario is not AUSENTE and usuario is not None:
+            self._usuarios.set(user_id, {**usuario, "saldo": saldo})
+        elif nome is not None:
+            self._usuarios.set(user_id, {"id": user_id, "nome": nome, "saldo": saldo})
+        else:
+            self._usuarios.remover(user_id)
+            leitura = self._lendo_usuarios.get(user_id)
+            if leitura:
+                leitura["saldo"] = saldo
+        self.ranking.atualizar(user_id, saldo, nome)
+
+    async def usuario_existe(self, user_id):
         """Verifica se o usuário já está registrado."""
-        user = self.sb.table("usuarios").select("id").eq("id", user_id).execute()
-        return bool(user.data)
+        return await self._get_usuario(user_id) is not None
 
-    def registrar_usuario(self, user_id, user_name):
+    async def registrar_usuario(self, user_id, user_name):
         """Registra um novo usuário com 5000 moedas iniciais."""
-        self.sb.table("usuarios").insert({"id": user_id, "nome": user_name, "saldo": 5000}).execute()
+        await self.backend.registrar_usuario(user_id, user_name, 5000)
+        self._saldo_alterado(user_id, 5000, user_name)
 
-    def get_saldo(self, user_id):
+    async def get_saldo(self, user_id):
         """Obtém o saldo do usuário."""
-        user = self.sb.table("usuarios").select("saldo").eq("id", user_id).execute()
-        return user.data[0]["saldo"] if user.data else None
+        usuario = await self._get_usuario(user_id)
+        return usuario["saldo"] if usuario else None
 
-    def apostar(self, user_id, time, valor):
-        """Registra uma aposta e atualiza o saldo do usuário."""
-        user = self.sb.table("usuarios").select("saldo").eq("id", user_id).execute()
-        if not user.data or user.data[0]["saldo"] < valor:
-            return False 
+    async def registrar_apostas_lote(self, apostas):
+        """Grava um lote de apostas da fila. Retorna id_cliente e novo saldo (None se recusada) de cada uma."""
+        resultados = await self.backend.registrar_apostas_lote(apostas)
+        self._leituras.limpar()
 
-        self.sb.table("usuarios").update({"saldo": user.data[0]["saldo"] - valor}).eq("id", user_id).execute()
-        self.sb.table("apostas").insert({"user_id": user_id, "time": time, "valor": valor}).execute()
-        return True
+        usuarios = {aposta["id_cliente"]: aposta["user_id"] for aposta in apostas}
+        for resultado in resultados:
+            self._saldo_alterado(usuarios[resultado["id_cliente"]], resultado["saldo"])
+        return resultados
 
-    def calcular_resultado(self, vencedor):
-        apostas = self.sb.table("apostas").select("user_id, valor").eq("time", vencedor).execute()
+    async def registrar_partida(self, time1: str, time2: str):
+        """Registra uma nova partida no banco de dados"""
+        match_id = await self.backend.registrar_partida(time1, time2)
+        self._leituras.limpar()
+        return match_id
 
-        if not apostas.data:
-            return 1, []
+    async def liquidar_partida(self, match_id: int, vencedor: str):
+        """Finaliza a partida e paga os vencedores em uma única transação no servidor"""
+        try:
+            pagamentos = await self.backend.liquidar_partida(match_id, vencedor)
+        except Exception as e:
+            print(f"Erro ao liquidar partida: {e}")
+            return None
+        self._leituras.limpar()
 
-        total_apostado = self.sb.table("apostas").select("valor").execute()
-        total_vencedor = sum(aposta["valor"] for aposta in apostas.data)
-        odds = sum(aposta["valor"] for aposta in total_apostado.data) / total_vencedor if total_vencedor > 0 else 1
+        for pagamento in pagamentos:
+            self._saldo_alterado(pagamento['user_id'], pagamento['saldo'])
 
-        vencedores = []
-        for aposta in apostas.data:
-            ganho = int(aposta["valor"] * odds)
-            self.sb.table("usuarios").update({"saldo": supabase.functions.increment(ganho)}).eq("id", aposta["user_id"]).execute()
-            vencedores.append(aposta["user_id"])
+        # A partida não muda mais: guarda já no histórico em memória, se ele já foi iniciado
+        if self.historico.carregado:
+            try:
+                self.historico.adicionar(await self.backend.get_partida(match_id))
+            except Exception as e:
+                print(f"Erro ao guardar partida {match_id} no histórico: {e}")
 
-        self.sb.table("apostas").delete().execute()
-        return odds, vencedores
-    
-    def atualizar_saldo(self, user_id, novo_saldo):
-        """Atualiza o saldo do usuário."""
-        self.sb.table("usuarios").update({"saldo": novo_saldo}).eq("id", user_id).execute()
-
-    def registrar_aposta(self, user_id, match_id, time, valor, multiplicador):
-        """Registra uma aposta."""
-        self.sb.table("apostas").insert({
-            "user_id": user_id,
-            "match_id": match_id,
-            "time": time,
-            "valor": valor,
-            "multiplicador": multiplicador
-        }).execute()
-
-    def get_apostas_vencedoras(self, match_id, time):
-        """Obtém todas as apostas vencedoras de uma partida."""
-        apostas = self.sb.table("apostas").select("*").eq("match_id", match_id).eq("time", time).execute()
-        return apostas.data
-
-    def remover_apostas(self, match_id):
-        """Remove todas as apostas de uma partida."""
-        self.sb.table("apostas").delete().eq("match_id", match_id).execute()
-
-    def registrar_partida(self, time1: str, time2: str):
-        """Registra uma nova partida no banco de dados"""
-        partida = self.sb.table("partidas").insert({
-            "time1": time1,
-            "time2": time2,
-            "finalizada": False,
-            "vencedor": None
-        }).execute()
-        return partida.data[0]["id"]
-
-    def finalizar_partida(self, match_id: int, vencedor: str):
-        """Marca uma partida como finalizada"""
-        self.sb.table("partidas").update({
-            "finalizada": True,
-            "vencedor": vencedor
-        }).eq("id", match_id).execute()
-
-    def get_partidas_ativas(self):
+        return {
+            'vencedores': len(pagamentos),
+            'total_pago': sum(pagamento['ganho'] for pagamento in pagamentos),
+            'pagamentos': pagamentos
+        }
+
+    async def get_partida(self, match_id: int):
+        """Retorna uma partida pelo ID (as finalizadas vêm do histórico em memória)"""
+        partida = self.historico.get(match_id)
+        if partida:
+            return partida
+
+        partida = await self.backend.get_partida(match_id)
+        if partida and partida["finalizada"]:
+            self.historico.adicionar(partida)
+        return partida
+
+    async def get_partidas_ativas(self):
         """Retorna todas as partidas não finalizadas"""
-        return self.sb.table("partidas").select("*").eq("finalizada", False).execute().data
+        return await self._leituras.executar("partidas_ativas", self.backend.get_partidas_ativas)
+
+    async def get_apostas_partidas_ativas(self):
+        """Retorna as apostas das partidas ativas somadas por partida, usuário e time"""
+        return await self.backend.get_apostas_partidas_ativas()
+
+    async def get_historico_partidas(self, limit=10, antes_de=None):
+        """Retorna uma página do histórico de partidas finalizadas (id menor que `antes_de`)"""
+        pagina = self.historico.pagina(limit, antes_de)
+        if pagina is not None:
+            return pagina
 
-    def get_historico_partidas(self, limit=10):
-        """Retorna o histórico de partidas finalizadas"""
-        return self.sb.table("partidas").select("*").eq("finalizada", True).order("id", desc=True).limit(limit).execute().data
+        pagina = await self._leituras.executar(
+            ("historico", limit, antes_de), self.backend.get_historico_partidas, limit, antes_de
+        )
+        self.historico.estender(pagina, limit, antes_de)
+        return pagina
 
-    def get_minhas_apostas(self, user_id: int):
-        """Retorna todas as apostas de um usuário com status correto"""
-        return self.sb.table("apostas").select( "*, partidas(time1, time2, finalizada, vencedor)").eq("user_id", user_id).execute().data
+    async def get_minhas_apostas(self, user_id: int, limit=10, antes_de=None):
+        """Retorna uma página das apostas do usuário (id menor que `antes_de`), com a partida de cada uma"""
+        return await self._leituras.executar(
+            ("minhas_apostas", user_id, limit, antes_de), self.backend.get_minhas_apostas, user_id, limit, antes_de
+        )
     
-    def get_ranking(self, limit=10):
+    async def carregar_ranking(self):
+        """Carrega o saldo de todos os usuários para o ranking em memória"""
+        self.ranking.carregar(await self.backend.listar_usuarios())
+
+    async def get_ranking(self, limit=10):
         """Retorna os usuários com maior saldo"""
-        return self.sb.table("usuarios").select("id, nome, saldo").order("saldo", desc=True).limit(limit).execute().data
+        if self.ranking.carregado:
+            return self.ranking.top(limit)
+        return await self._leituras.executar(("ranking", limit), self.backend.get_ranking, limit)
+
+    async def get_posicao_ranking(self, user_id: int):
+        """Retorna a posição do usuário no ranking e o saldo dele, ou None se não estiver registrado"""
+        if not self.ranking.carregado:
+            await self.carregar_ranking()
+        return self.ranking.posicao(user_id)
     
-    def get_estatisticas_apostas(self, user_id: int):
-        """Versão simplificada que evita o erro"""
-        # 1. Total de apostas (não muda)
-        total_apostas = self.sb.table("apostas").select("id", count="exact").eq("user_id", user_id).execute().count
-        
-        # 2. Valor total apostado (não muda)
-        valor_apostado = self.sb.table("apostas").select("valor").eq("user_id", user_id).execute()
-        total_apostado = sum(aposta['valor'] for aposta in valor_apostado.data) if valor_apostado.data else 0
-        
-        # 3. Apostas vencedoras (nova consulta segura)
-        apostas = self.sb.table("apostas").select("match_id, time").eq("user_id", user_id).execute().data
-        vitorias = 0
-        
-        for aposta in apostas:
-            partida = self.sb.table("partidas").select("vencedor, finalizada").eq("id", aposta["match_id"]).execute().data
-            if partida and partida[0]["finalizada"] and partida[0]["vencedor"] == aposta["time"]:
-                vitorias += 1
-        
-        return {
-            'total_apostas': total_apostas,
-            'apostas_vencedoras': vitorias,
-            'total_apostado': total_apostado
-        }
+    async def get_estatisticas_apostas(self, user_id: int):
+        """Retorna total de apostas, vitórias e valor apostado em uma única consulta agregada"""
+        return await self._leituras.executar(
+            ("estatisticas", user_id), self.backend.get_estatisticas_apostas, user_id
+        )
     
-    def registrar_resgate_diario(self, user_id: int):
-        """Registra o resgate diário e atualiza o saldo"""
+    async def resgatar_diario(self, user_id: int, valor=1000):
+        """Resgata as moedas do dia em uma única operação atômica.
+        Retorna o novo saldo, None se já resgatou hoje ou False se o banco falhou"""
         try:
-            # Verifica se já existe registro
-            resgate = self.sb.table("resgates").select("*").eq("user_id", user_id).execute()
-            
-            if resgate.data:
-                # Atualiza registro existente
-                self.sb.table("resgates").update({
-                    "ultimo_resgate": datetime.datetime.now().isoformat(),
-                    "total_resgatado": resgate.data[0]["total_resgatado"] + 1000
-                }).eq("user_id", user_id).execute()
-            else:
-                # Cria novo registro
-                self.sb.table("resgates").insert({
-                    "user_id": user_id,
-                    "ultimo_resgate": datetime.datetime.now().isoformat(),
-                    "total_resgatado": 1000
-                }).execute()
-            
-            # Atualiza saldo do usuário
-            saldo_atual = self.get_saldo(user_id)
-            self.sb.table("usuarios").update({
-                "saldo": saldo_atual + 1000
-            }).eq("id", user_id).execute()
-            
-            return True
+            saldo = await self.backend.resgatar_diario(user_id, valor, datetime.datetime.now())
         except Exception as e:
             print(f"Erro ao registrar resgate: {e}")
             return False
-    
-    def pode_resgatar_hoje(self, user_id: int):
-        """Verifica se o usuário já resgatou hoje"""
-        try:
-            resgate = self.sb.table("resgates").select("ultimo_resgate").eq("user_id", user_id).execute()
-            
-            if not resgate.data:
-                return True
-                
-            ultimo_resgate_str = resgate.data[0]["ultimo_resgate"]
-            ultimo_resgate = datetime.datetime.fromisoformat(ultimo_resgate_str.replace("Z", "+00:00"))
-            return ultimo_resgate.date() < datetime.datetime.now().date()
-        except Exception as e:
-            print(f"Erro ao verificar resgate: {e}")
-            return False
+
+        self._saldo_alterado(user_id, saldo)
+        return saldo
         
-    def set_command_channel(self, guild_id: int, channel_id: int):
+    async def verificar_saldo(self, user_id: int):
+        """Compara o saldo em cache com o recalculado pelo livro-razão. Retorna saldo, saldo_ledger e diferenca"""
+        saldos = await self.backend.verificar_saldo(user_id)
+        if saldos:
+            saldos["diferenca"] = saldos["saldo"] - saldos["saldo_ledger"]
+        return saldos
+
+    async def checkpoint_saldos(self):
+        """Consolida os lançamentos novos do livro-razão. Retorna quantos usuários foram atualizados"""
+        return await self.backend.checkpoint_saldos()
+
+    def iniciar_checkpoints(self, intervalo=CHECKPOINT_INTERVALO):
+        """Inicia a tarefa que faz checkpoints do livro-razão a cada `intervalo` segundos"""
+        if intervalo and self._tarefa_checkpoint is None:
+            self._tarefa_checkpoint = asyncio.create_task(self._checkpoint_periodico(intervalo))
+
+    async def _checkpoint_periodico(self, intervalo):
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                usuarios = await self.checkpoint_saldos()
+                print(f"Checkpoint do livro-razão: {usuarios} usuário(s) atualizado(s)")
+            except Exception as e:
+                print(f"Erro no checkpoint do livro-razão: {e}")
+
+    async def set_command_channel(self, guild_id: int, channel_id: int):
         """Define o canal permitido para comandos em um servidor"""
-        self.sb.table("server_config").upsert({
-            "guild_id": guild_id,
-            "command_channel": channel_id
-        }).execute()
-
-    def get_command_channel(self, guild_id: int):
-        """Obtém o canal configurado para comandos"""
-        config = self.sb.table("server_config").select("command_channel").eq("guild_id", guild_id).execute()
-        return config.data[0]["command_channel"] if config.data else None
-    
-    def cancelar_partida(self, match_id: int):
-        """Cancela uma partida e devolve as apostas"""
-        try:
-            apostas = self.sb.table("apostas").select("*").eq("match_id", match_id).execute().data
+        await self.backend.set_command_channel(guild_id, channel_id)
+        self._canais_comando[guild_id] = (channel_id, time.monotonic())
 
-            for aposta in apostas:
-                saldo_atual = self.get_saldo(aposta["user_id"])
-                self.sb.table("usuarios").update({
-                    "saldo": saldo_atual + aposta["valor"]
-                }).eq("id", aposta["user_id"]).execute()
+    async def carregar_configuracoes(self):
+        """Carrega o canal de comandos de todos os servidores para o cache"""
+        configs = await self.backend.listar_configuracoes()
+        agora = time.monotonic()
+        self._canais_comando = {
+            config["guild_id"]: (config["command_channel"], agora) for config in configs
+        }
 
-            self.sb.table("apostas").delete().eq("match_id", match_id).execute()
-            self.sb.table("partidas").delete().eq("id", match_id).execute()
+    async def get_command_channel(self, guild_id: int):
+        """Obtém o canal configurado para comandos (do cache quando possível)"""
+        cache = self._canais_comando.get(guild_id)
+        if cache and (not CONFIG_CACHE_TTL or time.monotonic() - cache[1] < CONFIG_CACHE_TTL):
+            return cache[0]
 
-            return True
+        channel_id = await self.backend.get_command_channel(guild_id)
+        self._canais_comando[guild_id] = (channel_id, time.monotonic())
+        return channel_id
+    
+    async def cancelar_partida(self, match_id: int):
+        """Cancela uma partida e devolve as apostas"""
+        try:
+            reembolsos = await self.backend.cancelar_partida(match_id)
         except Exception as e:
             print(f"Erro ao cancelar partida: {e}")
-            return False
\ No newline at end of file
+            return False
+        self._leituras.limpar()
+
+        for reembolso in reembolsos:
+            self._saldo_alterado(reembolso["user_id"], reembolso["saldo"])
+        self.historico.remover(match_id)
+        return True
@@ -0,0 +1,160 @@
+import asyncio
+import itertools
+import sqlite3
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from config import JOURNAL_PATH, FILA_TAMANHO_LOTE, FILA_INTERVALO
+
+class FilaApostas:
+    """
+    Fila de apostas aceitas que ainda não foram gravadas no Supabase.
+
+    Cada aposta é gravada primeiro em um journal SQLite local e só depois
+    confirmada ao usuário. Uma tarefa em segundo plano envia as apostas em
+    lotes e só as apaga do journal depois que o servidor responde, então
+    uma aposta confirmada sobrevive a um reinício do bot.
+    """
+
+    def __init__(self, db, caminho=JOURNAL_PATH, tamanho_lote=FILA_TAMANHO_LOTE, intervalo=FILA_INTERVALO):
+        self.db = db
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.ao_rejeitar = None
+
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS apostas_pendentes (
+                id_cliente TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                match_id INTEGER NOT NULL,
+                time TEXT NOT NULL,
+                valor INTEGER NOT NULL,
+                multiplicador REAL NOT NULL,
+                criada_em REAL NOT NULL
+            )
+        """)
+        # Canal onde a aposta foi feita, para avisar o apostador se o servidor a recusar
+        colunas = {coluna[1] for coluna in self._conn.execute("PRAGMA table_info(apostas_pendentes)")}
+        if "canal_id" not in colunas:
+            self._conn.execute("ALTER TABLE apostas_pendentes ADD COLUMN canal_id INTEGER")
+        # Uma única thread escreve no journal, na ordem em que as apostas chegam
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+
+        self._pendentes = {}
+        self._reservado = defaultdict(int)
+        self._evento = asyncio.Event()
+        self._envio_lock = asyncio.Lock()
+        self._tarefa = None
+
+    async def _journal(self, sql, parametros=()):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._conn.execute(sql, parametros).fetchall())
+
+    async def iniciar(self):
+        """Recupera as apostas do journal, envia as pendentes e inicia o envio em segundo plano"""
+        if self._tarefa is not None:
+            return
+
+        linhas = await self._journal(
+            "SELECT id_cliente, user_id, match_id, time, valor, multiplicador, canal_id FROM apostas_pendentes ORDER BY criada_em"
+        )
+        for id_cliente, user_id, match_id, time_, valor, multiplicador, canal_id in linhas:
+            self._adicionar({
+                "id_cliente": id_cliente,
+                "user_id": user_id,
+                "match_id": match_id,
+                "time": time_,
+                "valor": valor,
+                "multiplicador": multiplicador,
+                "canal_id": canal_id
+            })
+        if linhas:
+            print(f"{len(linhas)} aposta(s) pendente(s) recuperada(s) do journal")
+            await self.esvaziar()
+
+        self._tarefa = asyncio.create_task(self._enviar_periodicamente())
+
+    def _adicionar(self, aposta):
+        self._pendentes[aposta["id_cliente"]] = aposta
+        self._reservado[aposta["user_id"]] += aposta["valor"]
+
+    def _remover(self, id_cliente):
+        aposta = self._pendentes.pop(id_cliente)
+        self._reservado[aposta["user_id"]] -= aposta["valor"]
+        if not self._reservado[aposta["user_id"]]:
+            del self._reservado[aposta["user_id"]]
+        return aposta
+
+    def reservado(self, user_id):
+        """Soma das apostas do usuário que ainda não chegaram ao servidor"""
+        return self._reservado.get(user_id, 0)
+
+    def __len__(self):
+        return len(self._pendentes)
+
+    async def enfileirar(self, user_id, match_id, time_, valor, multiplicador, canal_id=None):
+        """Grava a aposta no journal local e a coloca na fila de envio"""
+        aposta = {
+            "id_cliente": uuid.uuid4().hex,
+            "user_id": user_id,
+            "match_id": match_id,
+            "time": time_,
+            "valor": valor,
+            "multiplicador": multiplicador,
+            "canal_id": canal_id
+        }
+        await self._journal(
+            "INSERT INTO apostas_pendentes (id_cliente, user_id, match_id, time, valor, multiplicador, criada_em, canal_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (aposta["id_cliente"], user_id, match_id, time_, valor, multiplicador, time.time(), canal_id)
+        )
+        self._adicionar(aposta)
+
+        if len(self._pendentes) >= self.tamanho_lote:
+            self._evento.set()
+        return aposta
+
+    async def _enviar_lote(self):
+        lote = list(itertools.islice(self._pendentes.values(), self.tamanho_lote))
+        resultados = await self.db.registrar_apostas_lote(lote)
+        if not resultados:
+            raise RuntimeError("o servidor não confirmou nenhuma aposta do lote")
+
+        # Libera a reserva antes de qualquer await: o saldo em cache já tem o débito destas apostas
+        for resultado in resultados:
+            aposta = self._remover(resultado["id_cliente"])
+            if resultado["saldo"] is None:
+                print(f"Aposta {aposta['id_cliente']} recusada pelo servidor: {aposta}")
+                if self.ao_rejeitar:
+                    self.ao_rejeitar(aposta)
+
+        # Se o bot cair antes desta limpeza, o reenvio é ignorado pelo id_cliente
+        ids = [resultado["id_cliente"] for resultado in resultados]
+        await self._journal(
+            f"DELETE FROM apostas_pendentes WHERE id_cliente IN ({', '.join('?' * len(ids))})", ids
+        )
+
+    async def esvaziar(self):
+        """Envia todas as apostas pendentes. Retorna False se alguma não pôde ser enviada."""
+        async with self._envio_lock:
+            try:
+                while self._pendentes:
+                    await self._enviar_lote()
+            except Exception as e:
+                print(f"Erro ao enviar apostas pendentes: {e}")
+                return False
+        return True
+
+    async def _enviar_periodicamente(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._evento.clear()
+            if self._pendentes:
+                await self.esvaziar()
@@ -0,0 +1,79 @@
+from sortedcontainers import SortedList
+from config import HISTORICO_TAMANHO
+
+class HistoricoPartidas:
+    """
+    Janela em memória com as partidas finalizadas mais recentes.
+
+    Uma partida finalizada nunca mais muda, então depois de lida ela pode ser servida
+    daqui. A janela começa vazia e é preenchida pelas páginas do !historico lidas do
+    banco, pelas partidas liquidadas e pelas lidas em `get_partida`. Ela guarda todas
+    as partidas finalizadas com id a partir do menor id guardado, então uma página
+    dentro dela custa O(log n + página); páginas mais antigas vêm do banco. No máximo
+    `tamanho_maximo` partidas ficam em memória: as mais antigas saem primeiro.
+    """
+
+    def __init__(self, tamanho_maximo=HISTORICO_TAMANHO):
+        self.tamanho_maximo = tamanho_maximo
+        self._partidas = {}
+        self._ids = SortedList()
+        # Se a janela já foi iniciada pela página mais recente do banco
+        self.carregado = False
+        # Se a janela tem todas as partidas finalizadas (não há nenhuma mais antiga)
+        self.completo = False
+
+    def _guardar(self, partida):
+        if partida["id"] not in self._partidas:
+            self._ids.add(partida["id"])
+        self._partidas[partida["id"]] = partida
+
+    def _aparar(self):
+        while len(self._ids) > self.tamanho_maximo:
+            del self._partidas[self._ids.pop(0)]
+            self.completo = False
+
+    def adicionar(self, partida):
+        """Guarda uma partida finalizada, se o id dela está dentro da janela"""
+        if not self.carregado:
+            return
+        if not self.completo and (not self._ids or partida["id"] < self._ids[0]):
+            # Entre ela e a janela pode haver partidas que não estão em memória
+            return
+        self._guardar(partida)
+        self._aparar()
+
+    def estender(self, partidas, limite, antes_de=None):
+        """Junta à janela uma página lida do banco (até `limite` partidas com id menor que `antes_de`)"""
+        if antes_de is None:
+            self.carregado = True
+        elif not self.carregado or not self._ids or antes_de < self._ids[0] or len(self._ids) >= self.tamanho_maximo:
+            # A página não continua a janela, ou a janela já está cheia
+            return
+
+        for partida in partidas:
+            self._guardar(partida)
+        if len(partidas) < limite:
+            self.completo = True
+        self._aparar()
+
+    def remover(self, match_id):
+        if self._partidas.pop(match_id, None) is not None:
+            self._ids.remove(match_id)
+
+    def get(self, match_id):
+        return self._partidas.get(match_id)
+
+    def pagina(self, limite, antes_de=None):
+        """
+        Até `limite` partidas com id menor que `antes_de`, da mais recente para a mais antiga,
+        ou None se a página sai da janela e precisa ser lida do banco
+        """
+        if not self.carregado:
+            return None
+        fim = len(self._ids) if antes_de is None else self._ids.bisect_left(antes_de)
+        if fim < limite and not self.completo:
+            return None
+        return [self._partidas[match_id] for match_id in reversed(self._ids[max(0, fim - limite):fim])]
+
+    def __len__(self):
+        return len(self._partidas)
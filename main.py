@@ -1,18 +1,34 @@
 import asyncio
 import datetime
+import typing
 import nextcord
 from nextcord.ext import commands
 from database import Database
+from fila_apostas import FilaApostas
+from mensageiro import Mensageiro
+from metricas import metricas
+from paginacao import Paginador
+from partidas import Partida, RegistroPartidas
+from tarefas import TarefasPartidas
+from config import METRICAS_PORTA
+from time import perf_counter
 import os
 from dotenv import load_dotenv
 
 intents = nextcord.Intents.default()
 intents.message_content = True
 sb = Database()
+fila_apostas = FilaApostas(sb)
+mensageiro = Mensageiro()
+tarefas = TarefasPartidas()
 bot = commands.Bot(command_prefix="!", intents=intents)
 
-matches = {}
+matches = RegistroPartidas()
+# Se a carga inicial (on_ready) já foi feita
+carregado = False
 SERVER_ID = 1351221849261998141
+# Cada aposta ocupa um campo do embed, e o Discord aceita no máximo 25
+APOSTAS_POR_PAGINA = 10
 
 @bot.event
 async def on_guild_join(guild):
@@ -36,34 +52,101 @@ async def global_check(ctx):
 
 @bot.event
 async def on_ready():
+    # O nextcord chama on_ready de novo a cada reconexão; recarregar as partidas do banco
+    # apagaria as apostas ainda na fila e reabriria partidas sendo liquidadas
+    global carregado
+    if not carregado:
+        carregado = True
+        try:
+            await sb.carregar_configuracoes()
+            await sb.carregar_ranking()
+            await fila_apostas.iniciar()
+            await carregar_partidas_ativas()
+            # Partidas com liquidação ou cancelamento interrompido continuam fechadas para apostas
+            for tarefa in await tarefas.iniciar():
+                if tarefa['match_id'] in matches:
+                    matches[tarefa['match_id']].finalizado = True
+            sb.iniciar_checkpoints()
+            if METRICAS_PORTA:
+                await metricas.iniciar_servidor(METRICAS_PORTA)
+        except Exception:
+            # Uma falha passageira do banco não pode desligar a carga até o bot reiniciar:
+            # o próximo on_ready tenta de novo (cada passo pode ser repetido com segurança)
+            carregado = False
+            raise
     print(f'Bot conectado como {bot.user}')
 
-def calcular_odds_justas(total_time, total_oponente):
-    """
-    Calcula odds P2P justas (sem margem da casa).
-    Retorna 2.0 quando equilibrado e proporcional quando não.
-    """
-    total_apostado = total_time + total_oponente
-    
-    if total_time == 0 and total_oponente == 0:
-        return 1.5
-    
-    if total_time == 0:
-        return 2.0
-    
-    odd = total_apostado / total_time
-    print("calculando odd", odd)
-    return max(1.1, round(odd, 2))
+@bot.before_invoke
+async def iniciar_metricas(ctx):
+    ctx.inicio_comando = perf_counter()
+    metricas.iniciar_comando()
+
+@bot.after_invoke
+async def registrar_metricas(ctx):
+    metricas.registrar_comando(ctx.command.qualified_name, perf_counter() - ctx.inicio_comando)
+
+def registrar_partida_em_memoria(match_id, time1, time2):
+    """Guarda a partida ativa em `matches`, com o bolão vazio"""
+    partida = Partida(match_id, time1, time2)
+    matches.adicionar(partida)
+    return partida
+
+async def carregar_partidas_ativas():
+    """Recarrega as partidas não finalizadas e o bolão de cada uma (ex.: após reiniciar o bot)"""
+    partidas = await sb.get_partidas_ativas()
+    apostas = await sb.get_apostas_partidas_ativas()
+
+    # Partidas que já estão em memória mantêm o bolão atual, que inclui as apostas ainda na fila
+    novas = {}
+    for partida in partidas:
+        if partida['id'] not in matches:
+            novas[partida['id']] = registrar_partida_em_memoria(partida['id'], partida['time1'], partida['time2'])
+
+    for aposta in apostas:
+        partida = novas.get(aposta['match_id'])
+        if partida and partida.tem_time(aposta['time']):
+            partida.adicionar(aposta['user_id'], aposta['time'], aposta['valor'], aposta['quantidade'])
+    print(f"{len(novas)} partida(s) ativa(s) carregada(s)")
+
+def aposta_recusada(aposta):
+    """Retira do bolão uma aposta da fila que o servidor recusou e avisa o apostador"""
+    partida = matches.get(aposta['match_id'])
+    if partida and partida.tem_time(aposta['time']):
+        partida.remover(aposta['user_id'], aposta['time'], aposta['valor'])
+
+    # No canal da aposta ou, se ele não estiver disponível, por mensagem direta
+    destino = bot.get_channel(aposta['canal_id']) if aposta.get('canal_id') else None
+    if destino is None:
+        destino = bot.get_user(aposta['user_id'])
+    if destino is None:
+        print(f"Não foi possível avisar {aposta['user_id']} da aposta recusada {aposta['id_cliente']}")
+        return
+    mensageiro.enviar(
+        destino,
+        content=(
+            f"<@{aposta['user_id']}> sua aposta de {aposta['valor']} moedas no {aposta['time']} "
+            f"(partida {aposta['match_id']}) foi recusada: a partida já estava encerrada ou o saldo não bastava. "
+            f"Nenhuma moeda foi debitada."
+        )
+    )
+
+fila_apostas.ao_rejeitar = aposta_recusada
+
+metricas.registrar_medidor("partidas_em_memoria", lambda: len(matches))
+metricas.registrar_medidor("apostadores_em_memoria", lambda: sum(len(partida.por_usuario) for partida in matches.ativas()))
+metricas.registrar_medidor("apostas_na_fila", lambda: len(fila_apostas))
+metricas.registrar_medidor("mensagens_na_fila", lambda: len(mensageiro))
+metricas.registrar_medidor("tarefas_de_partida", lambda: len(tarefas))
 
 @bot.command()
 async def registrar(ctx):
     user_id = ctx.author.id
     user_name = ctx.author.name
-    if sb.usuario_existe(user_id):
+    if await sb.usuario_existe(user_id):
         await ctx.send("Você já está registrado!")
         return
     
-    sb.registrar_usuario(user_id, user_name)
+    await sb.registrar_usuario(user_id, user_name)
     print(f"Usuário {user_name} registrado com ID {user_id}")
     await ctx.send(f"{user_name}, você foi registrado e recebeu 5000 moedas!")
 
@@ -72,12 +155,14 @@ async def saldo(ctx):
     user_id = ctx.author.id
     user = ctx.author
     
-    saldo_atual = sb.get_saldo(user_id)
+    saldo_atual = await sb.get_saldo(user_id)
     if saldo_atual is None:
         await ctx.send("Você não está registrado. Use !registrar primeiro.")
         return
+    # Apostas ainda na fila já foram aceitas, mas não foram debitadas no banco
+    saldo_atual -= fila_apostas.reservado(user_id)
     
-    stats = sb.get_estatisticas_apostas(user_id)
+    stats = await sb.get_estatisticas_apostas(user_id)
     total_apostas = stats['total_apostas']
     vitorias = stats['apostas_vencedoras']
     porcentagem = (vitorias / total_apostas * 100) if total_apostas > 0 else 0
@@ -119,48 +204,50 @@ async def saldo(ctx):
     await ctx.send(embed=embed)
 
 @bot.command()
-async def apostar(ctx, time: str, valor: int):
+async def apostar(ctx, match_id: typing.Optional[int], time: str, valor: int):
     user_id = ctx.author.id
-    
-    match_id = None
-    for id, match in matches.items():
-        if not match['finalizado']:
-            match_id = id
-            break
-    
-    if match_id not in matches or matches[match_id]['finalizado']:
-        ativas = [str(id) for id, m in matches.items() if not m['finalizado']]
-        if ativas:
-            await ctx.send(f"Partida inválida! Partidas ativas: {', '.join(ativas)}")
-        else:
+
+    # Sem o ID, a partida é a que tem o time escolhido (um time só joga uma partida ativa por vez)
+    partida = matches.get(match_id) if match_id is not None else matches.por_time(time)
+
+    if partida is None or partida.finalizado:
+        ativas = [str(ativa.id) for ativa in matches.ativas()]
+        if not ativas:
             await ctx.send("Não há partidas ativas no momento!")
+        elif match_id is None and partida is None:
+            await ctx.send("Time inválido! Nenhuma partida ativa tem esse time.")
+        else:
+            await ctx.send(f"Partida inválida! Partidas ativas: {', '.join(ativas)}")
         return
+    match_id = partida.id
 
-    if time not in [matches[match_id]['time1'], matches[match_id]['time2']]:
+    if not partida.tem_time(time):
         await ctx.send("Time inválido! Escolha entre os times da partida.")
         return
 
-    if not sb.usuario_existe(user_id):
-        await ctx.send("Você não está registrado. Use !registrar primeiro.")
+    if valor <= 0:
+        await ctx.send("O valor da aposta deve ser positivo!")
         return
 
-    saldo_atual = sb.get_saldo(user_id)
-    if saldo_atual < valor:
-        await ctx.send("Saldo insuficiente!")
-        return
-    
-    total_time1 = sum(matches[match_id]['apostas'][matches[match_id]['time1']].values()) if matches[match_id]['apostas'][matches[match_id]['time1']] else 0
-    total_time2 = sum(matches[match_id]['apostas'][matches[match_id]['time2']].values()) if matches[match_id]['apostas'][matches[match_id]['time2']] else 0
+    async with sb.lock_usuario(user_id):
+        saldo_atual = await sb.get_saldo(user_id)
+        if saldo_atual is None:
+            await ctx.send("Você não está registrado. Use !registrar primeiro.")
+            return
 
-    odds_time1 = calcular_odds_justas(total_time1, total_time2)
-    odds_time2 = calcular_odds_justas(total_time2, total_time1)
-    multiplicador = odds_time1 if time == matches[match_id]['time1'] else odds_time2
+        if saldo_atual - fila_apostas.reservado(user_id) < valor:
+            await ctx.send("Saldo insuficiente!")
+            return
 
-    sb.atualizar_saldo(user_id, saldo_atual - valor)
+        # A partida pode ter sido fechada para liquidação durante as esperas acima
+        if partida.finalizado:
+            await ctx.send(f"A partida {match_id} foi encerrada e não aceita mais apostas.")
+            return
 
-    sb.registrar_aposta(user_id, match_id, time, valor, multiplicador)
+        multiplicador = partida.odds(time)
+        await fila_apostas.enfileirar(user_id, match_id, time, valor, multiplicador, ctx.channel.id)
 
-    matches[match_id]['apostas'][time][user_id] = valor
+    partida.adicionar(user_id, time, valor)
     print(f"Aposta registrada: {user_id} apostou {valor} no {time}")
     await ctx.send(f"Aposta de {valor} moedas registrada no {time}! Multiplicador: {round(multiplicador, 2)}x")
 
@@ -185,8 +272,8 @@ async def comandos(ctx):
     )
     
     help_embed.add_field(
-        name="!apostar <time> <valor>",
-        value="Aposta em um time na partida ativa",
+        name="!apostar [partida] <time> <valor>",
+        value="Aposta em um time; sem o ID, vale a partida ativa desse time",
         inline=False
     )
     
@@ -225,19 +312,12 @@ async def comandos(ctx):
 @bot.command()
 async def iniciar_partida(ctx, time1: str, time2: str):
     if ctx.author.guild_permissions.administrator:
-        partidas_ativas = sb.get_partidas_ativas()
-        for partida in partidas_ativas:
-            if time1 in [partida['time1'], partida['time2']] or time2 in [partida['time1'], partida['time2']]:
-                await ctx.send(f"Erro: Time '{time1}' ou '{time2}' já está em uma partida ativa!")
-                return
+        if matches.por_time(time1) or matches.por_time(time2):
+            await ctx.send(f"Erro: Time '{time1}' ou '{time2}' já está em uma partida ativa!")
+            return
         
-        match_id = sb.registrar_partida(time1, time2)
-        matches[match_id] = {
-            'time1': time1,
-            'time2': time2,
-            'apostas': {time1: {}, time2: {}},
-            'finalizado': False
-        }
+        match_id = await sb.registrar_partida(time1, time2)
+        registrar_partida_em_memoria(match_id, time1, time2)
 
         embed = nextcord.Embed(
             title=" NOVA PARTIDA INICIADA! ",
@@ -273,37 +353,187 @@ async def iniciar_partida(ctx, time1: str, time2: str):
         )
         await ctx.send(embed=embed)
 
+# Etapas mostradas no embed de progresso de cada tipo de tarefa
+ETAPAS_TAREFA = {
+    "liquidar": ("Gravar as apostas da fila", "Pagar os vencedores", "Avisar os vencedores"),
+    "cancelar": ("Gravar as apostas da fila", "Devolver as apostas")
+}
+
+def embed_tarefa(tarefa, concluidas, erro=None, resumo=None):
+    """Embed de progresso de uma liquidação ou cancelamento"""
+    etapas = ETAPAS_TAREFA[tarefa['tipo']]
+    if tarefa['tipo'] == "liquidar":
+        titulo = f"🏁 Finalizando a partida {tarefa['match_id']} (vencedor: {tarefa['vencedor']})"
+    else:
+        titulo = f"🚫 Cancelando a partida {tarefa['match_id']}"
+
+    linhas = []
+    for numero, etapa in enumerate(etapas):
+        if numero < concluidas:
+            icone = "✅"
+        elif numero == concluidas:
+            icone = "❌" if erro else "⏳"
+        else:
+            icone = "▫️"
+        linhas.append(f"{icone} {etapa}")
+
+    if erro:
+        cor = 0xff0000
+    elif concluidas >= len(etapas):
+        cor = 0x00ff00
+    else:
+        cor = 0xffa500
+    embed = nextcord.Embed(title=titulo, description="\n".join(linhas), color=cor)
+    if erro:
+        embed.add_field(name="Erro", value=erro, inline=False)
+    if resumo:
+        embed.add_field(name="Resumo", value=resumo, inline=False)
+    return embed
+
+async def agendar_tarefa(ctx, tarefa):
+    """
+    Responde com o embed de progresso e grava a tarefa de uma partida já reservada com
+    `tarefas.reservar`. Retorna False (e libera a reserva) se não foi possível agendar.
+    """
+    try:
+        mensagem = await ctx.send(embed=embed_tarefa(tarefa, 0))
+        await tarefas.agendar(
+            tarefa['tipo'], tarefa['match_id'], tarefa.get('vencedor'), canal=ctx.channel, mensagem=mensagem
+        )
+    except Exception as e:
+        tarefas.liberar(tarefa['match_id'])
+        print(f"Erro ao agendar a tarefa {tarefa['tipo']} da partida {tarefa['match_id']}: {e}")
+        return False
+    return True
+
+def canal_da_tarefa(tarefa):
+    """Canal onde a tarefa foi pedida (após um reinício, buscado pelo ID)"""
+    if tarefa.get('canal') is None and tarefa['canal_id'] is not None:
+        tarefa['canal'] = bot.get_channel(tarefa['canal_id'])
+    return tarefa.get('canal')
+
+async def atualizar_progresso(tarefa, concluidas, erro=None, resumo=None):
+    """Edita o embed de progresso da tarefa; uma falha aqui não interrompe a tarefa"""
+    mensagem = tarefa.get('mensagem')
+    if mensagem is None:
+        canal = canal_da_tarefa(tarefa)
+        if canal is None or tarefa['mensagem_id'] is None:
+            return
+        mensagem = tarefa['mensagem'] = canal.get_partial_message(tarefa['mensagem_id'])
+    try:
+        await mensagem.edit(embed=embed_tarefa(tarefa, concluidas, erro, resumo))
+    except Exception as e:
+        print(f"Erro ao atualizar o progresso da partida {tarefa['match_id']}: {e}")
+
+def reabrir_partida(match_id):
+    """Volta a aceitar apostas na partida depois de uma tarefa que falhou"""
+    partida = matches.get(match_id)
+    if partida:
+        partida.finalizado = False
+
+async def executar_liquidacao(tarefa):
+    match_id, vencedor = tarefa['match_id'], tarefa['vencedor']
+    if tarefa['retomada']:
+        await atualizar_progresso(tarefa, 0)
+    if not await fila_apostas.esvaziar():
+        reabrir_partida(match_id)
+        await atualizar_progresso(tarefa, 0, "Não foi possível gravar as apostas da fila.")
+        return
+    await atualizar_progresso(tarefa, 1)
+
+    # Se o bot caiu depois de pagar, a partida já consta como finalizada e não é paga de novo
+    if tarefa['retomada']:
+        partida = await sb.get_partida(match_id)
+        if partida and partida['finalizada']:
+            matches.remover(match_id)
+            await atualizar_progresso(tarefa, len(ETAPAS_TAREFA['liquidar']), resumo="A partida já havia sido liquidada.")
+            return
+
+    resultado = await sb.liquidar_partida(match_id, vencedor)
+    if resultado is None:
+        reabrir_partida(match_id)
+        await atualizar_progresso(tarefa, 1, "Erro ao pagar os vencedores. Verifique os logs.")
+        return
+
+    # O resumo da partida fica no histórico; o bolão dela não é mais necessário
+    matches.remover(match_id)
+    print(f"Partida {match_id} finalizada! Vencedor: {vencedor}. {resultado['vencedores']} pagamentos, {resultado['total_pago']} moedas.")
+    await atualizar_progresso(tarefa, 2)
+
+    # Os avisos aos vencedores saem agrupados e no ritmo permitido pelo Discord
+    canal = canal_da_tarefa(tarefa)
+    if canal is not None:
+        pagamentos = sorted(resultado['pagamentos'], key=lambda pagamento: -pagamento['ganho'])
+        mensageiro.enviar_lista(
+            canal,
+            f"💰 Pagamentos da partida {match_id}",
+            [f"<@{pagamento['user_id']}>: +{pagamento['ganho']} moedas (saldo: {pagamento['saldo']})" for pagamento in pagamentos]
+        )
+    await atualizar_progresso(
+        tarefa, 3,
+        resumo=(
+            f"O time {vencedor} venceu a partida {match_id}! Pagamentos realizados: "
+            f"{resultado['total_pago']} moedas para {resultado['vencedores']} apostador(es)."
+        )
+    )
+
+async def executar_cancelamento(tarefa):
+    match_id = tarefa['match_id']
+    if tarefa['retomada']:
+        await atualizar_progresso(tarefa, 0)
+    if not await fila_apostas.esvaziar():
+        reabrir_partida(match_id)
+        await atualizar_progresso(tarefa, 0, "Não foi possível gravar as apostas da fila.")
+        return
+    await atualizar_progresso(tarefa, 1)
+
+    # Se o bot caiu depois de devolver as apostas, a partida já foi apagada
+    if tarefa['retomada'] and not await sb.get_partida(match_id):
+        matches.remover(match_id)
+        await atualizar_progresso(tarefa, 2, resumo="A partida já havia sido cancelada.")
+        return
+
+    if not await sb.cancelar_partida(match_id):
+        reabrir_partida(match_id)
+        await atualizar_progresso(tarefa, 1, "Erro ao devolver as apostas. Verifique os logs.")
+        return
+
+    matches.remover(match_id)
+    print(f"Partida {match_id} cancelada")
+    await atualizar_progresso(tarefa, 2, resumo=f"Partida {match_id} cancelada com sucesso! Todas as apostas foram devolvidas.")
+
+tarefas.registrar("liquidar", executar_liquidacao)
+tarefas.registrar("cancelar", executar_cancelamento)
+
 @bot.command()
 async def finalizar_partida(ctx, match_id: int, vencedor: str):
     if ctx.author.guild_permissions.administrator:
-        if match_id not in matches or matches[match_id]['finalizado']:
+        if match_id not in matches or matches[match_id].finalizado:
             await ctx.send("Partida não encontrada ou já finalizada!")
             return
         
-        if vencedor not in matches[match_id]['apostas']:
+        if not matches[match_id].tem_time(vencedor):
             await ctx.send("Time vencedor inválido!")
             return
         
-        sb.finalizar_partida(match_id, vencedor)
-        matches[match_id]['finalizado'] = True
-        matches[match_id]['vencedor'] = vencedor 
-        
-        apostas_vencedoras = sb.get_apostas_vencedoras(match_id, vencedor)
-        
-        for aposta in apostas_vencedoras:
-            user_id = aposta['user_id']
-            valor = aposta['valor']
-            multiplicador = aposta['multiplicador']
-            ganho = int(valor * multiplicador)
-            sb.atualizar_saldo(user_id, sb.get_saldo(user_id) + ganho)
-        print(f"Partida {match_id} finalizada! Vencedor: {vencedor}. Pagamentos realizados.")
-        await ctx.send(f"O time {vencedor} venceu a partida {match_id}! Pagamentos realizados.")
+        # Reserva a partida e bloqueia novas apostas antes de qualquer await; o pagamento roda em segundo plano
+        if not tarefas.reservar(match_id):
+            await ctx.send(f"A partida {match_id} já está sendo finalizada ou cancelada.")
+            return
+        partida = matches[match_id]
+        partida.finalizado = True
+        tarefa = {"tipo": "liquidar", "match_id": match_id, "vencedor": vencedor}
+        if not await agendar_tarefa(ctx, tarefa):
+            # A reserva era desta chamada, então nenhuma outra tarefa fechou a partida
+            partida.finalizado = False
+            await ctx.send("Erro ao finalizar a partida. Verifique os logs.")
     else:
         await ctx.send("Você não tem permissão para finalizar partidas.")
 
 @bot.command()
 async def odds(ctx):
-    partidas_ativas = sb.get_partidas_ativas()
+    # O bolão em memória já inclui as apostas que ainda estão na fila, como o multiplicador do !apostar
+    partidas_ativas = sorted(matches.ativas(), key=lambda partida: partida.id)
     
     if not partidas_ativas:
         await ctx.send("Não há partidas ativas no momento!")
@@ -315,22 +545,12 @@ async def odds(ctx):
     )
     
     for partida in partidas_ativas:
-        match_id = partida['id']
-        
-        apostas = sb.sb.table("apostas").select("time, valor").eq("match_id", match_id).execute().data
-        
-        total_time1 = sum(aposta['valor'] for aposta in apostas if aposta['time'] == partida['time1'])
-        total_time2 = sum(aposta['valor'] for aposta in apostas if aposta['time'] == partida['time2'])
-        
-        odds_time1 = calcular_odds_justas(total_time1, total_time2)
-        odds_time2 = calcular_odds_justas(total_time2, total_time1)
-        
         embed.add_field(
-            name=f"Partida {match_id}: {partida['time1']} vs {partida['time2']}",
+            name=f"Partida {partida.id}: {partida.time1} vs {partida.time2}",
             value=(
-                f"🔵 {partida['time1']}: {odds_time1}x\n"
-                f"🔴 {partida['time2']}: {odds_time2}x\n"
-                f"💸 Total apostado: {total_time1 + total_time2} moedas"
+                f"🔵 {partida.time1}: {partida.odds(partida.time1)}x\n"
+                f"🔴 {partida.time2}: {partida.odds(partida.time2)}x\n"
+                f"💸 Total apostado: {sum(partida.totais)} moedas"
             ),
             inline=False
         )
@@ -341,19 +561,22 @@ async def odds(ctx):
 @bot.command()
 async def minhas_apostas(ctx):
     user_id = ctx.author.id
-    apostas = sb.get_minhas_apostas(user_id)
-    
-    if not apostas:
+
+    async def buscar(limite, antes_de):
+        return await sb.get_minhas_apostas(user_id, limite, antes_de)
+
+    paginador = Paginador(user_id, buscar, embed_minhas_apostas, APOSTAS_POR_PAGINA)
+    if not await paginador.enviar(ctx):
         await ctx.send("Você não fez nenhuma aposta ainda!")
-        return
-    
+
+def embed_minhas_apostas(apostas, pagina):
     embed = nextcord.Embed(
         title="Suas Apostas",
         color=0x3498db
     )
     
     for aposta in apostas:
-        partida_info = aposta.get("partidas", {})
+        partida_info = aposta.get("partidas") or {}
         finalizada = partida_info.get("finalizada", False)
         vencedor = partida_info.get("vencedor")
         
@@ -369,18 +592,22 @@ async def minhas_apostas(ctx):
             value=f"Time: {aposta['time']}\nValor: {aposta['valor']} moedas\nOdd: {aposta['multiplicador']}x\nStatus: {status}",
             inline=False
         )
-    await ctx.send(embed=embed)
+    embed.set_footer(text=f"Página {pagina}")
+    return embed
 
 @bot.command()
 async def historico(ctx, limit: int = 5):
-    historico = sb.get_historico_partidas(limit)
-    
-    if not historico:
-        await ctx.send("Nenhuma partida finalizada ainda!")
+    if limit > 20 or limit < 1:
+        await ctx.send("Por favor, especifique um limite entre 1 e 20.")
         return
-    
+
+    paginador = Paginador(ctx.author.id, sb.get_historico_partidas, embed_historico, limit)
+    if not await paginador.enviar(ctx):
+        await ctx.send("Nenhuma partida finalizada ainda!")
+
+def embed_historico(historico, pagina):
     embed = nextcord.Embed(
-        title=f"Últimas {len(historico)} partidas",
+        title="Histórico de partidas",
         color=0xe67e22
     )
     
@@ -390,8 +617,8 @@ async def historico(ctx, limit: int = 5):
             value=f"Vencedor: {partida['vencedor']}\nFinalizada em: {partida['created_at'][:10]}",
             inline=False
         )
-    
-    await ctx.send(embed=embed)
+    embed.set_footer(text=f"Página {pagina}")
+    return embed
 
 @bot.command()
 async def rank(ctx, limit: int = 10):
@@ -399,7 +626,7 @@ async def rank(ctx, limit: int = 10):
         await ctx.send("Por favor, especifique um limite entre 1 e 20.")
         return
 
-    ranking = sb.get_ranking(limit)
+    ranking = await sb.get_ranking(limit)
     
     if not ranking:
         await ctx.send("Nenhum usuário encontrado!")
@@ -429,18 +656,29 @@ async def rank(ctx, limit: int = 10):
             inline=False
         )
     
-    embed.set_footer(text=f"Seu saldo: {sb.get_saldo(ctx.author.id)} moedas | !saldo para ver detalhes")
+    posicao = await sb.get_posicao_ranking(ctx.author.id)
+    if posicao:
+        embed.set_footer(text=f"Sua posição: #{posicao[0]} | Seu saldo: {posicao[1]} moedas | !saldo para ver detalhes")
+    else:
+        embed.set_footer(text="Você ainda não está no ranking. Use !registrar para participar!")
     await ctx.send(embed=embed)
 
 @bot.command()
 async def resgatar(ctx):
     user_id = ctx.author.id
     
-    if not sb.usuario_existe(user_id):
+    if not await sb.usuario_existe(user_id):
         await ctx.send("Você precisa se registrar primeiro com !registrar")
         return
     
-    if not sb.pode_resgatar_hoje(user_id):
+    # A checagem do dia, a marcação e o crédito acontecem juntos no banco
+    saldo = await sb.resgatar_diario(user_id)
+
+    if saldo is False:
+        await ctx.send("Erro ao resgatar as moedas. Tente novamente mais tarde.")
+        return
+
+    if saldo is None:
         embed = nextcord.Embed(
             title="⏳ Resgate Diário",
             description="Você já resgatou suas moedas hoje!",
@@ -450,8 +688,6 @@ async def resgatar(ctx):
         await ctx.send(embed=embed)
         return
     
-    sb.registrar_resgate_diario(user_id)
-    
     embed = nextcord.Embed(
         title="🎉 Resgate Diário Concluído!",
         description=f"{ctx.author.display_name} resgatou 1000 moedas!",
@@ -459,7 +695,7 @@ async def resgatar(ctx):
     )
     embed.add_field(
         name="Saldo Atual",
-        value=f"🪙 {sb.get_saldo(user_id)} moedas",
+        value=f"🪙 {saldo - fila_apostas.reservado(user_id)} moedas",
         inline=False
     )
     embed.set_footer(text="Volte amanhã para mais!")
@@ -470,7 +706,7 @@ async def resgatar(ctx):
 @commands.has_permissions(administrator=True)
 async def setcommandchannel(ctx):
     """Define o canal atual como exclusivo para comandos"""
-    sb.set_command_channel(ctx.guild.id, ctx.channel.id)
+    await sb.set_command_channel(ctx.guild.id, ctx.channel.id)
     
     embed = nextcord.Embed(
         title="✅ Canal Configurado",
@@ -479,12 +715,81 @@ async def setcommandchannel(ctx):
     )
     await ctx.send(embed=embed)
 
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def stats(ctx):
+    """Mostra latência, erros e consultas ao banco dos comandos"""
+    embed = nextcord.Embed(
+        title="📈 Estatísticas do Bot",
+        description=f"Desde <t:{int(metricas.iniciado_em)}:R> • chamadas acima de {metricas.lentidao * 1000:.0f} ms vão para o log",
+        color=0x9b59b6
+    )
+
+    # Os comandos que mais consumiram tempo no total primeiro
+    comandos = sorted(metricas.comandos.items(), key=lambda item: -item[1].latencia.soma)[:12]
+    for nome, estatistica in comandos:
+        latencia = estatistica.latencia
+        embed.add_field(
+            name=f"!{nome}",
+            value=(
+                f"{latencia.total} chamadas • {estatistica.erros} erros\n"
+                f"p50 ≤ {latencia.percentil(50) * 1000:g} ms • p95 ≤ {latencia.percentil(95) * 1000:g} ms\n"
+                f"{estatistica.consultas / max(latencia.total, 1):.1f} consultas/comando"
+            ),
+            inline=True
+        )
+
+    consultas = sorted(metricas.consultas.items(), key=lambda item: -item[1].latencia.soma)[:10]
+    if consultas:
+        embed.add_field(
+            name="Consultas ao banco (por tempo total)",
+            value="\n".join(
+                f"`{nome}`: {estatistica.latencia.total}x, p95 ≤ {estatistica.latencia.percentil(95) * 1000:g} ms, "
+                f"{estatistica.erros} erros"
+                for nome, estatistica in consultas
+            ),
+            inline=False
+        )
+
+    medidores = metricas.ler_medidores()
+    if "memoria_residente_bytes" in medidores:
+        medidores["memoria_residente_bytes"] = f"{medidores['memoria_residente_bytes'] / 2**20:.1f} MiB"
+    embed.add_field(
+        name="Memória",
+        value="\n".join(f"`{nome}`: {valor}" for nome, valor in sorted(medidores.items())),
+        inline=False
+    )
+
+    if not comandos and not consultas:
+        embed.description = "Nenhum comando executado ainda."
+    await ctx.send(embed=embed)
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def auditar(ctx, membro: nextcord.Member = None):
+    """Confere o saldo de um usuário contra o livro-razão"""
+    usuario = membro or ctx.author
+    saldos = await sb.verificar_saldo(usuario.id)
+    if saldos is None:
+        await ctx.send(f"{usuario.display_name} não está registrado.")
+        return
+
+    correto = saldos["diferenca"] == 0
+    embed = nextcord.Embed(
+        title=f"🧾 Auditoria de {usuario.display_name}",
+        color=0x00ff00 if correto else 0xff0000
+    )
+    embed.add_field(name="Saldo", value=f"🪙 {saldos['saldo']} moedas", inline=True)
+    embed.add_field(name="Livro-razão", value=f"📒 {saldos['saldo_ledger']} moedas", inline=True)
+    embed.set_footer(text="Saldo confere com os lançamentos" if correto else f"Diferença de {saldos['diferenca']} moedas")
+    await ctx.send(embed=embed)
+
 @bot.check
 async def channel_check(ctx):
     if not ctx.guild:
         return True
         
-    allowed_channel = sb.get_command_channel(ctx.guild.id)
+    allowed_channel = await sb.get_command_channel(ctx.guild.id)
     
     if not allowed_channel:
         return True
@@ -493,7 +798,7 @@ async def channel_check(ctx):
 @bot.event
 async def on_command_error(ctx, error):
     if isinstance(error, commands.CheckFailure):
-        allowed_channel = sb.get_command_channel(ctx.guild.id)
+        allowed_channel = await sb.get_command_channel(ctx.guild.id)
         if allowed_channel:
             channel = bot.get_channel(allowed_channel)
             embed = nextcord.Embed(
@@ -505,14 +810,21 @@ async def on_command_error(ctx, error):
             await ctx.message.delete()
         return
 
+    if ctx.command:
+        metricas.registrar_erro_comando(ctx.command.qualified_name)
+        print(f"Erro no comando !{ctx.command.qualified_name}: {error}")
+
 @bot.command()
 @commands.has_permissions(administrator=True)
 async def cancelar_partida(ctx, match_id: int):
     # Verifica se a partida existe
-    partida = sb.sb.table("partidas").select("*").eq("id", match_id).execute().data
+    partida = await sb.get_partida(match_id)
     if not partida:
         await ctx.send(f"Partida {match_id} não encontrada!")
         return
+    if partida['finalizada']:
+        await ctx.send(f"A partida {match_id} já foi finalizada e não pode ser cancelada!")
+        return
 
     # Confirmação segura
     embed = nextcord.Embed(
@@ -520,7 +832,7 @@ async def cancelar_partida(ctx, match_id: int):
         description=f"Você está prestes a cancelar a partida {match_id}\nIsso devolverá todas as apostas!",
         color=0xFF0000
     )
-    embed.add_field(name="Times", value=f"{partida[0]['time1']} vs {partida[0]['time2']}")
+    embed.add_field(name="Times", value=f"{partida['time1']} vs {partida['time2']}")
     embed.set_footer(text="Reaja com ✅ para confirmar ou ❌ para cancelar")
 
     msg = await ctx.send(embed=embed)
@@ -535,13 +847,18 @@ async def cancelar_partida(ctx, match_id: int):
         reaction, _ = await bot.wait_for("reaction_add", timeout=30.0, check=check)
         
         if str(reaction.emoji) == "✅":
-            if sb.cancelar_partida(match_id):
-                # Remove do dicionário se existir
-                if match_id in matches:
-                    del matches[match_id]
-                
-                await ctx.send(f"Partida {match_id} cancelada com sucesso! Todas as apostas foram devolvidas.")
-            else:
+            # Reserva a partida e bloqueia novas apostas antes de qualquer await; a devolução roda em segundo plano
+            if not tarefas.reservar(match_id):
+                await ctx.send(f"A partida {match_id} já está sendo finalizada ou cancelada.")
+                return
+            partida_em_memoria = matches.get(match_id)
+            fechou = partida_em_memoria is not None and not partida_em_memoria.finalizado
+            if fechou:
+                partida_em_memoria.finalizado = True
+            if not await agendar_tarefa(ctx, {"tipo": "cancelar", "match_id": match_id}):
+                # Só reabre a partida se foi esta chamada que a fechou
+                if fechou:
+                    partida_em_memoria.finalizado = False
                 await ctx.send("Erro ao cancelar a partida. Verifique os logs.")
         else:
             await ctx.send("Cancelamento abortado.")
@@ -549,7 +866,8 @@ async def cancelar_partida(ctx, match_id: int):
     except asyncio.TimeoutError:
         await ctx.send("Tempo de confirmação esgotado. Operação cancelada.")
         
-load_dotenv()
-TOKEN = os.getenv("DISCORD_TOKEN")
+if __name__ == "__main__":
+    load_dotenv()
+    TOKEN = os.getenv("DISCORD_TOKEN")
 
-bot.run(TOKEN)
\ No newline at end of file
+    bot.run(TOKEN)
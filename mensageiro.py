@@ -0,0 +1,132 @@
+import asyncio
+import time
+from collections import deque
+import nextcord
+from cache import AUSENTE, CacheTTL
+from config import MENSAGENS_POR_SEGUNDO, MENSAGENS_POR_CANAL, MENSAGENS_JANELA_CANAL
+
+# Limites do Discord: caracteres na descrição de um embed, caracteres somados de todos os
+# embeds de uma mensagem e embeds por mensagem
+LIMITE_DESCRICAO = 4096
+LIMITE_MENSAGEM = 6000
+EMBEDS_POR_MENSAGEM = 10
+# Caracteres reservados em cada embed para o rodapé "Página x/y"
+RESERVA_RODAPE = 32
+
+def agrupar_linhas(titulo, linhas):
+    """Divide as linhas em mensagens, cada uma uma lista de descrições de embed dentro dos limites do Discord"""
+    custo_embed = len(titulo) + RESERVA_RODAPE
+    mensagens = []
+    descricoes = []
+    embed = []
+    tamanho_embed = 0
+    # Caracteres ainda livres na mensagem atual, sem contar o embed em montagem
+    restante = LIMITE_MENSAGEM
+    for linha in linhas:
+        linha = linha[:LIMITE_DESCRICAO]
+        tamanho = tamanho_embed + len(linha) + (1 if embed else 0)
+        if embed and (tamanho > LIMITE_DESCRICAO or custo_embed + tamanho > restante):
+            descricoes.append("\n".join(embed))
+            restante -= custo_embed + tamanho_embed
+            embed, tamanho_embed = [], 0
+        if not embed and (len(descricoes) == EMBEDS_POR_MENSAGEM or custo_embed + len(linha) > restante):
+            mensagens.append(descricoes)
+            descricoes, restante = [], LIMITE_MENSAGEM
+        tamanho_embed += len(linha) + (1 if embed else 0)
+        embed.append(linha)
+
+    if embed:
+        descricoes.append("\n".join(embed))
+    if descricoes:
+        mensagens.append(descricoes)
+    return mensagens
+
+class BaldeTokens:
+    """Token bucket: até `capacidade` envios de uma vez, repostos à razão de `taxa` por segundo"""
+
+    __slots__ = ("capacidade", "taxa", "tokens", "atualizado_em")
+
+    def __init__(self, capacidade, taxa):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self.tokens = capacidade
+        self.atualizado_em = time.monotonic()
+
+    def espera(self):
+        """Segundos até haver um token disponível (0 se já houver)"""
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.taxa
+
+    async def consumir(self):
+        while (espera := self.espera()) > 0:
+            await asyncio.sleep(espera)
+        self.tokens -= 1
+
+class Mensageiro:
+    """
+    Fila de mensagens de saída do bot.
+
+    Cada canal (rota) tem sua própria fila e seu token bucket, e todos dividem um
+    bucket global, então as mensagens saem no ritmo que o Discord permite sem que o
+    comando que as gerou precise esperar. Uma rota lenta não atrasa as outras.
+    """
+
+    def __init__(self, por_segundo=MENSAGENS_POR_SEGUNDO, por_canal=MENSAGENS_POR_CANAL,
+                 janela_canal=MENSAGENS_JANELA_CANAL):
+        self._global = BaldeTokens(por_segundo, por_segundo)
+        self.por_canal = por_canal
+        self.janela_canal = janela_canal
+        # Um bucket parado por uma janela inteira já estaria cheio, então pode ser descartado
+        self._baldes = CacheTTL(1000, janela_canal)
+        self._filas = {}
+        self._tarefas = set()
+
+    def enviar(self, destino, **conteudo):
+        """Coloca uma mensagem na fila do canal `destino` (qualquer objeto com .id e .send)"""
+        fila = self._filas.get(destino.id)
+        if fila is None:
+            fila = self._filas[destino.id] = deque()
+            tarefa = asyncio.create_task(self._esvaziar_rota(destino, fila))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+        fila.append(conteudo)
+
+    def enviar_lista(self, destino, titulo, linhas, cor=0x00ff00):
+        """Agrupa uma lista longa em embeds paginados, com o máximo de linhas que cabe em cada mensagem"""
+        mensagens = agrupar_linhas(titulo, linhas)
+        paginas = sum(len(descricoes) for descricoes in mensagens)
+        numero = 0
+        for descricoes in mensagens:
+            embeds = []
+            for descricao in descricoes:
+                numero += 1
+                embed = nextcord.Embed(title=titulo, description=descricao, color=cor)
+                if paginas > 1:
+                    embed.set_footer(text=f"Página {numero}/{paginas}")
+                embeds.append(embed)
+            self.enviar(destino, embeds=embeds)
+
+    def _balde(self, rota):
+        balde = self._baldes.get(rota)
+        if balde is AUSENTE:
+            balde = BaldeTokens(self.por_canal, self.por_canal / self.janela_canal)
+        self._baldes.set(rota, balde)
+        return balde
+
+    async def _esvaziar_rota(self, destino, fila):
+        try:
+            while fila:
+                await self._balde(destino.id).consumir()
+                await self._global.consumir()
+                conteudo = fila.popleft()
+                try:
+                    await destino.send(**conteudo)
+                except Exception as e:
+                    print(f"Erro ao enviar mensagem para o canal {destino.id}: {e}")
+        finally:
+            del self._filas[destino.id]
+
+    def __len__(self):
+        return sum(len(fila) for fila in self._filas.values())
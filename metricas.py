@@ -0,0 +1,181 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import os
+import time
+from collections import defaultdict
+from config import LENTIDAO_MS
+
+# Limites (em segundos) dos intervalos dos histogramas de latência
+LIMITES = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Contador de consultas do comando em execução (uma lista de um item, para ser mutável)
+_consultas_comando = contextvars.ContextVar("consultas_comando", default=None)
+
+class Histograma:
+    """Histograma de latências com intervalos fixos, no formato do Prometheus"""
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, segundos):
+        self.contagens[bisect.bisect_left(LIMITES, segundos)] += 1
+        self.soma += segundos
+        self.total += 1
+
+    def percentil(self, p):
+        """Limite superior do intervalo onde está o percentil `p` (em segundos)"""
+        if not self.total:
+            return 0.0
+        alvo = p / 100 * self.total
+        acumulado = 0
+        for limite, contagem in zip(LIMITES, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+def memoria_residente():
+    """Memória residente do processo em bytes, ou None fora do Linux"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class Estatistica:
+    __slots__ = ("latencia", "erros", "consultas")
+
+    def __init__(self):
+        self.latencia = Histograma()
+        self.erros = 0
+        self.consultas = 0
+
+class Metricas:
+    """Latência, chamadas, erros e consultas ao banco de cada comando e de cada método do backend"""
+
+    def __init__(self, lentidao_ms=LENTIDAO_MS):
+        self.lentidao = lentidao_ms / 1000
+        self.comandos = defaultdict(Estatistica)
+        self.consultas = defaultdict(Estatistica)
+        self.iniciado_em = time.time()
+        # nome -> função que devolve o valor atual (tamanho de caches, memória...)
+        self.medidores = {"memoria_residente_bytes": memoria_residente}
+        self._servidor = None
+
+    def registrar_medidor(self, nome, funcao):
+        """Expõe o valor devolvido por `funcao` como um gauge, lido a cada exportação"""
+        self.medidores[nome] = funcao
+
+    def ler_medidores(self):
+        valores = {}
+        for nome, funcao in self.medidores.items():
+            valor = funcao()
+            if valor is not None:
+                valores[nome] = valor
+        return valores
+
+    def iniciar_comando(self):
+        """Começa a contar as consultas feitas pelo comando atual"""
+        _consultas_comando.set([0])
+
+    def registrar_comando(self, nome, segundos):
+        contador = _consultas_comando.get()
+        estatistica = self.comandos[nome]
+        estatistica.latencia.observar(segundos)
+        estatistica.consultas += contador[0] if contador else 0
+        if self.lentidao and segundos >= self.lentidao:
+            print(f"Comando lento: !{nome} levou {segundos * 1000:.0f} ms ({contador[0] if contador else 0} consultas)")
+
+    def registrar_erro_comando(self, nome):
+        self.comandos[nome].erros += 1
+
+    def registrar_consulta(self, metodo, segundos, erro=False):
+        estatistica = self.consultas[metodo]
+        estatistica.latencia.observar(segundos)
+        if erro:
+            estatistica.erros += 1
+
+        contador = _consultas_comando.get()
+        if contador:
+            contador[0] += 1
+        if self.lentidao and segundos >= self.lentidao:
+            print(f"Consulta lenta: {metodo} levou {segundos * 1000:.0f} ms")
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus"""
+        linhas = []
+        for prefixo, rotulo, grupo in (
+            ("botcc_comando", "comando", self.comandos),
+            ("botcc_consulta", "metodo", self.consultas),
+        ):
+            linhas.append(f"# TYPE {prefixo}_segundos histogram")
+            for nome, estatistica in sorted(grupo.items()):
+                histograma = estatistica.latencia
+                acumulado = 0
+                for limite, contagem in zip(LIMITES + ("+Inf",), histograma.contagens):
+                    acumulado += contagem
+                    linhas.append(f'{prefixo}_segundos_bucket{{{rotulo}="{nome}",le="{limite}"}} {acumulado}')
+                linhas.append(f'{prefixo}_segundos_sum{{{rotulo}="{nome}"}} {histograma.soma}')
+                linhas.append(f'{prefixo}_segundos_count{{{rotulo}="{nome}"}} {histograma.total}')
+            linhas.append(f"# TYPE {prefixo}_erros_total counter")
+            for nome, estatistica in sorted(grupo.items()):
+                linhas.append(f'{prefixo}_erros_total{{{rotulo}="{nome}"}} {estatistica.erros}')
+
+        linhas.append("# TYPE botcc_comando_consultas_total counter")
+        for nome, estatistica in sorted(self.comandos.items()):
+            linhas.append(f'botcc_comando_consultas_total{{comando="{nome}"}} {estatistica.consultas}')
+
+        for nome, valor in sorted(self.ler_medidores().items()):
+            linhas.append(f"# TYPE botcc_{nome} gauge")
+            linhas.append(f"botcc_{nome} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    async def iniciar_servidor(self, porta):
+        """Expõe as métricas em http://0.0.0.0:<porta>/metrics"""
+        if self._servidor:
+            return
+        from aiohttp import web
+
+        async def metrics(request):
+            return web.Response(text=self.exportar(), content_type="text/plain")
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "0.0.0.0", porta).start()
+        self._servidor = runner
+        print(f"Métricas disponíveis em http://0.0.0.0:{porta}/metrics")
+
+class BackendInstrumentado:
+    """Envolve um backend medindo cada método assíncrono (cada um é uma ida ao banco)"""
+
+    def __init__(self, backend, metricas):
+        self._backend = backend
+        self._metricas = metricas
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._backend, nome)
+        if nome == "conectar" or not asyncio.iscoroutinefunction(atributo):
+            return atributo
+
+        @functools.wraps(atributo)
+        async def medir(*args, **kwargs):
+            inicio = time.perf_counter()
+            erro = False
+            try:
+                return await atributo(*args, **kwargs)
+            except Exception:
+                erro = True
+                raise
+            finally:
+                self._metricas.registrar_consulta(nome, time.perf_counter() - inicio, erro)
+        # Guarda o método já envolvido para não recriá-lo a cada chamada
+        setattr(self, nome, medir)
+        return medir
+
+metricas = Metricas()
@@ -0,0 +1,69 @@
+import nextcord
+
+class Paginador(nextcord.ui.View):
+    """
+    Embed paginado com botões de anterior/próxima. Cada página é buscada no banco só
+    quando exibida, por cursor (o menor id da página anterior), nunca por offset.
+    """
+
+    def __init__(self, autor_id, buscar, montar_embed, tamanho_pagina, timeout=120):
+        super().__init__(timeout=timeout)
+        self.autor_id = autor_id
+        # buscar(limite, antes_de) -> itens com "id", do maior para o menor id
+        self.buscar = buscar
+        # montar_embed(itens, numero_da_pagina) -> nextcord.Embed
+        self.montar_embed = montar_embed
+        self.tamanho_pagina = tamanho_pagina
+        self.itens = []
+        self.cursor = None
+        self.tem_proxima = False
+        self.mensagem = None
+        # Cursores das páginas já vistas, para voltar sem refazer a navegação
+        self._anteriores = []
+
+    async def carregar(self, cursor):
+        # Um item a mais indica se existe próxima página sem precisar de um count
+        itens = await self.buscar(self.tamanho_pagina + 1, cursor)
+        self.tem_proxima = len(itens) > self.tamanho_pagina
+        self.itens = itens[:self.tamanho_pagina]
+        self.cursor = cursor
+        self.anterior.disabled = not self._anteriores
+        self.proxima.disabled = not self.tem_proxima
+
+    def embed(self):
+        return self.montar_embed(self.itens, len(self._anteriores) + 1)
+
+    async def enviar(self, ctx):
+        """Envia a primeira página. Retorna False se não houver nenhum item"""
+        await self.carregar(None)
+        if not self.itens:
+            self.stop()
+            return False
+
+        if self.tem_proxima:
+            self.mensagem = await ctx.send(embed=self.embed(), view=self)
+        else:
+            # Tudo coube em uma página: não há o que navegar
+            self.stop()
+            await ctx.send(embed=self.embed())
+        return True
+
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.autor_id
+
+    @nextcord.ui.button(label="◀ Anterior", style=nextcord.ButtonStyle.secondary, disabled=True)
+    async def anterior(self, button, interaction):
+        await self.carregar(self._anteriores.pop())
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @nextcord.ui.button(label="Próxima ▶", style=nextcord.ButtonStyle.secondary)
+    async def proxima(self, button, interaction):
+        self._anteriores.append(self.cursor)
+        await self.carregar(self.itens[-1]["id"])
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.mensagem:
+            await self.mensagem.edit(view=self)
@@ -0,0 +1,124 @@
+def calcular_odds_justas(total_time, total_oponente):
+    """
+    Calcula odds P2P justas (sem margem da casa).
+    Retorna 2.0 quando equilibrado e proporcional quando não.
+    """
+    total_apostado = total_time + total_oponente
+    
+    if total_time == 0 and total_oponente == 0:
+        return 1.5
+    
+    if total_time == 0:
+        return 2.0
+    
+    odd = total_apostado / total_time
+    return max(1.1, round(odd, 2))
+
+class Partida:
+    """
+    Partida ativa com o bolão de cada time.
+
+    Totais, quantidade de apostas e o valor apostado por cada usuário são mantidos
+    incrementalmente a cada aposta, então consultar odds custa O(1) e os números
+    batem com a tabela `apostas`. Os valores por time ficam em listas [time1, time2].
+    """
+
+    __slots__ = ("id", "time1", "time2", "totais", "quantidades", "por_usuario", "finalizado")
+
+    def __init__(self, match_id, time1, time2):
+        self.id = match_id
+        self.time1 = time1
+        self.time2 = time2
+        self.totais = [0, 0]
+        self.quantidades = [0, 0]
+        # user_id -> [valor no time1, valor no time2]
+        self.por_usuario = {}
+        self.finalizado = False
+
+    def _indice(self, time):
+        if time == self.time1:
+            return 0
+        if time == self.time2:
+            return 1
+        raise ValueError(f"Time {time} não está na partida {self.id}")
+
+    def tem_time(self, time):
+        return time == self.time1 or time == self.time2
+
+    def adicionar(self, user_id, time, valor, quantidade=1):
+        indice = self._indice(time)
+        self.totais[indice] += valor
+        self.quantidades[indice] += quantidade
+        self.por_usuario.setdefault(user_id, [0, 0])[indice] += valor
+
+    def remover(self, user_id, time, valor):
+        """Desfaz uma aposta (ex.: recusada pelo servidor depois de entrar na fila)"""
+        indice = self._indice(time)
+        self.totais[indice] -= valor
+        self.quantidades[indice] -= 1
+        apostado = self.por_usuario.get(user_id)
+        if apostado:
+            apostado[indice] -= valor
+            if not any(apostado):
+                del self.por_usuario[user_id]
+
+    def total(self, time):
+        return self.totais[self._indice(time)]
+
+    def quantidade(self, time):
+        return self.quantidades[self._indice(time)]
+
+    def apostado_por(self, user_id, time):
+        apostado = self.por_usuario.get(user_id)
+        return apostado[self._indice(time)] if apostado else 0
+
+    def odds(self, time):
+        indice = self._indice(time)
+        return calcular_odds_justas(self.totais[indice], self.totais[1 - indice])
+
+class RegistroPartidas:
+    """
+    Partidas ativas em memória, indexadas pelo id e pelo nome de cada time. Um time
+    só pode estar em uma partida ativa por vez, então o índice por time leva direto
+    à partida de uma aposta. Partidas liquidadas ou canceladas saem do registro (as
+    finalizadas continuam disponíveis, resumidas, no histórico do Database).
+    """
+
+    def __init__(self):
+        self._por_id = {}
+        self._por_time = {}
+
+    def adicionar(self, partida):
+        self._por_id[partida.id] = partida
+        self._por_time[partida.time1] = partida
+        self._por_time[partida.time2] = partida
+
+    def remover(self, match_id):
+        """Tira a partida do registro e libera os times dela para novas partidas"""
+        partida = self._por_id.pop(match_id, None)
+        if partida:
+            for time in (partida.time1, partida.time2):
+                if self._por_time.get(time) is partida:
+                    del self._por_time[time]
+
+    def por_time(self, time):
+        """Partida em que o time joga, ou None"""
+        return self._por_time.get(time)
+
+    def ativas(self):
+        return [partida for partida in self._por_id.values() if not partida.finalizado]
+
+    def get(self, match_id, padrao=None):
+        return self._por_id.get(match_id, padrao)
+
+    def items(self):
+        return self._por_id.items()
+
+    def __getitem__(self, match_id):
+        return self._por_id[match_id]
+
+    def __contains__(self, match_id):
+        return match_id in self._por_id
+
+    def __len__(self):
+        return len(self._por_id)
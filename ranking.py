@@ -0,0 +1,50 @@
+import itertools
+from sortedcontainers import SortedList
+
+class Ranking:
+    """
+    Ranking de saldos mantido em memória.
+
+    Guarda os usuários ordenados por saldo (decrescente, empates pelo menor ID),
+    então o top N e a posição de um usuário custam O(log n) sem consultar o banco.
+    """
+
+    def __init__(self):
+        self._ordem = SortedList()
+        self._usuarios = {}
+        self.carregado = False
+
+    def carregar(self, usuarios):
+        """Substitui o ranking pelos usuários informados (dicts com id, nome e saldo)"""
+        self._usuarios = {usuario["id"]: (usuario["nome"], usuario["saldo"]) for usuario in usuarios}
+        self._ordem = SortedList((-saldo, user_id) for user_id, (_, saldo) in self._usuarios.items())
+        self.carregado = True
+
+    def atualizar(self, user_id, saldo, nome=None):
+        """Registra o novo saldo de um usuário"""
+        if saldo is None:
+            return
+
+        anterior = self._usuarios.get(user_id)
+        if anterior:
+            self._ordem.remove((-anterior[1], user_id))
+            nome = nome or anterior[0]
+        self._usuarios[user_id] = (nome, saldo)
+        self._ordem.add((-saldo, user_id))
+
+    def top(self, limite):
+        """Retorna os `limite` usuários com maior saldo"""
+        return [
+            {"id": user_id, "nome": self._usuarios[user_id][0], "saldo": -saldo}
+            for saldo, user_id in itertools.islice(self._ordem, limite)
+        ]
+
+    def posicao(self, user_id):
+        """Retorna a posição (começando em 1) e o saldo do usuário, ou None se não estiver no ranking"""
+        usuario = self._usuarios.get(user_id)
+        if usuario is None:
+            return None
+        return self._ordem.bisect_left((-usuario[1], user_id)) + 1, usuario[1]
+
+    def __len__(self):
+        return len(self._usuarios)
@@ -0,0 +1,314 @@
+-- Funções e índices usados pelo bot no Supabase.
+-- Execute este arquivo no SQL Editor do projeto sempre que ele mudar.
+
+-- Paginação por id das apostas de um usuário (!minhas_apostas) e do histórico (!historico)
+drop index if exists apostas_user_id_idx;
+create index if not exists apostas_user_id_id_idx on apostas (user_id, id);
+create index if not exists partidas_finalizada_id_idx on partidas (finalizada, id);
+create index if not exists apostas_match_id_time_idx on apostas (match_id, time);
+
+-- Funções que o bot não usa mais
+drop function if exists totais_partidas_ativas();
+drop function if exists calcular_resultado(bigint, text);
+drop function if exists registrar_aposta(bigint, bigint, text, bigint, numeric);
+
+-- Identificador gerado pelo bot para cada aposta da fila; evita gravar duas vezes
+-- a mesma aposta quando um lote é reenviado
+alter table apostas add column if not exists id_cliente text unique;
+
+-- Livro-razão dos saldos: cada alteração de usuarios.saldo vira um lançamento imutável
+-- (gravado pelos gatilhos no fim deste arquivo). usuarios.saldo é o valor em cache.
+create table if not exists transacoes (
+    id bigint generated always as identity primary key,
+    user_id bigint not null,
+    tipo text not null,
+    valor bigint not null,
+    match_id bigint,
+    created_at timestamptz not null default now()
+);
+create index if not exists transacoes_user_id_id_idx on transacoes (user_id, id);
+
+-- Saldo de cada usuário consolidado até o lançamento ultima_transacao
+create table if not exists saldos_checkpoint (
+    user_id bigint primary key,
+    saldo bigint not null,
+    ultima_transacao bigint not null,
+    atualizado_em timestamptz not null default now()
+);
+
+-- Saldo de abertura de quem já existia antes do livro-razão
+insert into transacoes (user_id, tipo, valor)
+select u.id, 'abertura', u.saldo
+from usuarios u
+where not exists (select 1 from transacoes t where t.user_id = u.id);
+
+-- Tipo (aposta, pagamento, reembolso, resgate...) e partida dos lançamentos seguintes da
+-- transação atual; sem isso, as alterações de saldo são lançadas como 'ajuste'
+create or replace function definir_lancamento(p_tipo text, p_match_id bigint default null)
+returns void
+language plpgsql as $$
+begin
+    perform set_config('botcc.tipo', p_tipo, true);
+    perform set_config('botcc.match_id', coalesce(p_match_id::text, ''), true);
+end;
+$$;
+
+-- Estatísticas de apostas de um usuário em uma única ida ao banco (!saldo)
+create or replace function estatisticas_apostas(p_user_id bigint)
+returns table (total_apostas bigint, apostas_vencedoras bigint, total_apostado bigint)
+language sql stable as $$
+    select count(*),
+           count(*) filter (where p.finalizada and p.vencedor = a.time),
+           coalesce(sum(a.valor), 0)
+    from apostas a
+    left join partidas p on p.id = a.match_id
+    where a.user_id = p_user_id;
+$$;
+
+-- Finaliza a partida e paga todos os vencedores em uma única transação.
+-- Devolve uma linha por usuário pago com o ganho e o novo saldo.
+create or replace function liquidar_partida(p_match_id bigint, p_vencedor text)
+returns table (user_id bigint, ganho bigint, saldo bigint)
+language plpgsql as $$
+#variable_conflict use_column
+begin
+    perform 1 from partidas where id = p_match_id and not finalizada for update;
+    if not found then
+        raise exception 'Partida % não encontrada ou já finalizada', p_match_id;
+    end if;
+
+    update partidas set finalizada = true, vencedor = p_vencedor where id = p_match_id;
+    perform definir_lancamento('pagamento', p_match_id);
+
+    return query
+    with pagamentos as (
+        select a.user_id, sum(floor(a.valor * a.multiplicador))::bigint as ganho
+        from apostas a
+        where a.match_id = p_match_id and a.time = p_vencedor
+        group by a.user_id
+    )
+    update usuarios u set saldo = u.saldo + p.ganho
+    from pagamentos p
+    where u.id = p.user_id
+    returning u.id, p.ganho, u.saldo;
+end;
+$$;
+
+-- Cancela uma partida ainda não finalizada: devolve as apostas com um crédito por usuário e apaga apostas e
+-- partida na mesma transação. Devolve uma linha por usuário com o reembolso e o novo saldo.
+create or replace function cancelar_partida(p_match_id bigint)
+returns table (user_id bigint, reembolso bigint, saldo bigint)
+language plpgsql as $$
+#variable_conflict use_column
+begin
+    perform 1 from partidas where id = p_match_id and not finalizada for update;
+    if not found then
+        raise exception 'Partida % não encontrada ou já finalizada', p_match_id;
+    end if;
+    perform definir_lancamento('reembolso', p_match_id);
+
+    return query
+    with reembolsos as (
+        select a.user_id, sum(a.valor)::bigint as reembolso
+        from apostas a
+        where a.match_id = p_match_id
+        group by a.user_id
+    )
+    update usuarios u set saldo = u.saldo + r.reembolso
+    from reembolsos r
+    where u.id = r.user_id
+    returning u.id, r.reembolso, u.saldo;
+
+    delete from apostas where match_id = p_match_id;
+    delete from partidas where id = p_match_id;
+end;
+$$;
+
+-- Apostas das partidas ativas somadas por partida, usuário e time (carga do bolão ao iniciar o bot)
+create or replace function apostas_partidas_ativas()
+returns table (match_id bigint, user_id bigint, "time" text, valor bigint, quantidade bigint)
+language sql stable as $$
+    select a.match_id::bigint, a.user_id::bigint, a.time::text, sum(a.valor)::bigint, count(*)
+    from apostas a
+    join partidas p on p.id = a.match_id
+    where not p.finalizada
+    group by a.match_id, a.user_id, a.time;
+$$;
+
+-- Debita o saldo apenas se houver moedas suficientes; devolve o novo saldo ou null.
+-- Usada pelas funções abaixo, não diretamente pelo bot.
+create or replace function debitar_saldo(p_user_id bigint, p_valor bigint)
+returns bigint
+language sql as $$
+    update usuarios set saldo = saldo - p_valor
+    where id = p_user_id and p_valor > 0 and saldo >= p_valor
+    returning saldo;
+$$;
+
+-- Credita o saldo; devolve o novo saldo ou null se o usuário não existir (usada pelo resgate diário)
+create or replace function creditar_saldo(p_user_id bigint, p_valor bigint)
+returns bigint
+language sql as $$
+    update usuarios set saldo = saldo + p_valor
+    where id = p_user_id
+    returning saldo;
+$$;
+
+-- Grava um lote de apostas da fila do bot. Cada aposta é debitada e inserida
+-- apenas uma vez (pelo id_cliente); saldo volta null para as apostas recusadas.
+create or replace function registrar_apostas_lote(p_apostas jsonb)
+returns table (id_cliente text, saldo bigint)
+language plpgsql as $$
+#variable_conflict use_column
+declare
+    aposta jsonb;
+    novo_saldo bigint;
+begin
+    for aposta in select * from jsonb_array_elements(p_apostas) loop
+        if exists (select 1 from apostas a where a.id_cliente = aposta->>'id_cliente') then
+            select u.saldo into novo_saldo from usuarios u where u.id = (aposta->>'user_id')::bigint;
+        else
+            -- Trava a partida como liquidar_partida e cancelar_partida (que usam for update):
+            -- ou a aposta entra antes e é paga/devolvida, ou o lote espera e a vê fechada
+            perform 1 from partidas p
+            where p.id = (aposta->>'match_id')::bigint and not p.finalizada
+            for share;
+            if not found then
+                novo_saldo := null;
+            else
+                perform definir_lancamento('aposta', (aposta->>'match_id')::bigint);
+                novo_saldo := debitar_saldo((aposta->>'user_id')::bigint, (aposta->>'valor')::bigint);
+                if novo_saldo is not null then
+                    insert into apostas (id_cliente, user_id, match_id, time, valor, multiplicador)
+                    values (
+                        aposta->>'id_cliente',
+                        (aposta->>'user_id')::bigint,
+                        (aposta->>'match_id')::bigint,
+                        aposta->>'time',
+                        (aposta->>'valor')::bigint,
+                        (aposta->>'multiplicador')::numeric
+                    );
+                end if;
+            end if;
+        end if;
+
+        id_cliente := aposta->>'id_cliente';
+        saldo := novo_saldo;
+        return next;
+    end loop;
+end;
+$$;
+
+-- Resgate diário atômico: confere se o usuário ainda não resgatou no dia de p_agora,
+-- marca o resgate e credita o valor. Devolve o novo saldo ou null.
+create or replace function resgatar_diario(p_user_id bigint, p_valor bigint, p_agora timestamp)
+returns bigint
+language plpgsql as $$
+begin
+    -- Trava o usuário para que cliques simultâneos sejam processados um de cada vez
+    perform 1 from usuarios where id = p_user_id for update;
+    if not found then
+        return null;
+    end if;
+
+    insert into resgates (user_id, ultimo_resgate, total_resgatado)
+    values (p_user_id, p_agora, p_valor)
+    on conflict (user_id) do update set
+        ultimo_resgate = excluded.ultimo_resgate,
+        total_resgatado = resgates.total_resgatado + excluded.total_resgatado
+    where resgates.ultimo_resgate is null
+       or resgates.ultimo_resgate::date < excluded.ultimo_resgate::date;
+    if not found then
+        return null;
+    end if;
+
+    perform definir_lancamento('resgate');
+    return creditar_saldo(p_user_id, p_valor);
+end;
+$$;
+
+-- Lançamentos do livro-razão: um insert por comando, com todas as linhas alteradas
+create or replace function lancar_alteracoes_saldo()
+returns trigger
+language plpgsql as $$
+begin
+    insert into transacoes (user_id, tipo, valor, match_id)
+    select n.id,
+           coalesce(nullif(current_setting('botcc.tipo', true), ''), 'ajuste'),
+           n.saldo - o.saldo,
+           nullif(current_setting('botcc.match_id', true), '')::bigint
+    from novos n
+    join antigos o on o.id = n.id
+    where n.saldo <> o.saldo;
+    return null;
+end;
+$$;
+
+create or replace function lancar_saldos_iniciais()
+returns trigger
+language plpgsql as $$
+begin
+    insert into transacoes (user_id, tipo, valor)
+    select n.id, 'registro', n.saldo
+    from novos n
+    where n.saldo <> 0;
+    return null;
+end;
+$$;
+
+drop trigger if exists usuarios_lancar_alteracoes on usuarios;
+create trigger usuarios_lancar_alteracoes
+after update on usuarios
+referencing old table as antigos new table as novos
+for each statement execute function lancar_alteracoes_saldo();
+
+drop trigger if exists usuarios_lancar_registro on usuarios;
+create trigger usuarios_lancar_registro
+after insert on usuarios
+referencing new table as novos
+for each statement execute function lancar_saldos_iniciais();
+
+-- Consolida em saldos_checkpoint os lançamentos feitos desde o último checkpoint.
+-- Lançamentos do último minuto ficam para o próximo, para não pular transações ainda
+-- abertas que pegaram um id menor. Devolve quantos usuários foram atualizados.
+create or replace function checkpoint_saldos()
+returns bigint
+language plpgsql as $$
+declare
+    v_desde bigint;
+    v_ate bigint;
+    v_usuarios bigint;
+begin
+    select coalesce(max(ultima_transacao), 0) into v_desde from saldos_checkpoint;
+    select coalesce(max(id), v_desde) into v_ate
+    from transacoes
+    where id > v_desde and created_at < now() - interval '1 minute';
+
+    insert into saldos_checkpoint (user_id, saldo, ultima_transacao)
+    select t.user_id, sum(t.valor), v_ate
+    from transacoes t
+    where t.id > v_desde and t.id <= v_ate
+    group by t.user_id
+    on conflict (user_id) do update set
+        saldo = saldos_checkpoint.saldo + excluded.saldo,
+        ultima_transacao = excluded.ultima_transacao,
+        atualizado_em = now();
+    get diagnostics v_usuarios = row_count;
+    return v_usuarios;
+end;
+$$;
+
+-- Saldo em cache do usuário e o saldo recalculado pelo livro-razão (checkpoint + lançamentos seguintes)
+create or replace function verificar_saldo(p_user_id bigint)
+returns table (saldo bigint, saldo_ledger bigint)
+language sql stable as $$
+    select u.saldo::bigint,
+           (coalesce(c.saldo, 0) + coalesce((
+               select sum(t.valor)
+               from transacoes t
+               where t.user_id = u.id and t.id > coalesce(c.ultima_transacao, 0)
+           ), 0))::bigint
+    from usuarios u
+    left join saldos_checkpoint c on c.user_id = u.id
+    where u.id = p_user_id;
+$$;
@@ -0,0 +1,138 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import TAREFAS_PATH, TAREFAS_CONCORRENCIA
+
+class TarefasPartidas:
+    """
+    Liquidações e cancelamentos de partidas executados em segundo plano.
+
+    A tarefa é gravada em um arquivo SQLite local antes de o comando responder
+    e só é apagada quando termina, então uma tarefa interrompida por um reinício
+    volta a ser executada em `iniciar`. No máximo `concorrencia` tarefas rodam
+    ao mesmo tempo; o que cada tipo faz é registrado com `registrar`.
+    """
+
+    def __init__(self, caminho=TAREFAS_PATH, concorrencia=TAREFAS_CONCORRENCIA):
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tarefas_pendentes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                match_id INTEGER NOT NULL,
+                vencedor TEXT,
+                canal_id INTEGER,
+                mensagem_id INTEGER,
+                criada_em REAL NOT NULL
+            )
+        """)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tarefas")
+
+        self.concorrencia = max(1, int(concorrencia))
+        self._executores = {}
+        self._semaforo = None
+        # match_id -> tarefa agendada ou em execução (None enquanto só está reservada)
+        self._pendentes = {}
+        self._em_execucao = set()
+
+    async def _banco(self, sql, parametros=()):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._conn.execute(sql, parametros))
+
+    def registrar(self, tipo, executor):
+        """`executor(tarefa)` é a corrotina que processa as tarefas do tipo `tipo`"""
+        self._executores[tipo] = executor
+
+    async def iniciar(self):
+        """Retoma as tarefas que ficaram pendentes e devolve a lista delas"""
+        cursor = await self._banco(
+            "SELECT id, tipo, match_id, vencedor, canal_id, mensagem_id FROM tarefas_pendentes ORDER BY id"
+        )
+        tarefas = []
+        for id_, tipo, match_id, vencedor, canal_id, mensagem_id in cursor.fetchall():
+            if match_id in self._pendentes:
+                continue
+            tarefas.append({
+                "id": id_,
+                "tipo": tipo,
+                "match_id": match_id,
+                "vencedor": vencedor,
+                "canal_id": canal_id,
+                "mensagem_id": mensagem_id,
+                "retomada": True
+            })
+        if tarefas:
+            print(f"{len(tarefas)} tarefa(s) de partida retomada(s)")
+        for tarefa in tarefas:
+            self._iniciar_tarefa(tarefa)
+        return tarefas
+
+    def reservar(self, match_id):
+        """
+        Reserva a partida para uma tarefa, sem nenhum await no caminho. Retorna False se ela
+        já tem uma tarefa ou reserva. Depois de reservar, chame `agendar` ou `liberar`.
+        """
+        if match_id in self._pendentes:
+            return False
+        self._pendentes[match_id] = None
+        return True
+
+    def liberar(self, match_id):
+        """Desfaz uma reserva que não virou tarefa"""
+        if match_id in self._pendentes and self._pendentes[match_id] is None:
+            del self._pendentes[match_id]
+
+    async def agendar(self, tipo, match_id, vencedor=None, canal=None, mensagem=None):
+        """Grava a tarefa de uma partida já reservada e a coloca na fila"""
+        if self._pendentes.get(match_id, False) is not None:
+            raise ValueError(f"A partida {match_id} não está reservada para uma nova tarefa")
+        tarefa = {
+            "tipo": tipo,
+            "match_id": match_id,
+            "vencedor": vencedor,
+            "canal_id": getattr(canal, "id", None),
+            "mensagem_id": getattr(mensagem, "id", None),
+            "retomada": False,
+            "canal": canal,
+            "mensagem": mensagem
+        }
+        cursor = await self._banco(
+            "INSERT INTO tarefas_pendentes (tipo, match_id, vencedor, canal_id, mensagem_id, criada_em) VALUES (?, ?, ?, ?, ?, ?)",
+            (tipo, match_id, vencedor, tarefa["canal_id"], tarefa["mensagem_id"], time.time())
+        )
+        tarefa["id"] = cursor.lastrowid
+        self._iniciar_tarefa(tarefa)
+        return tarefa
+
+    def pendente(self, match_id):
+        return match_id in self._pendentes
+
+    def _iniciar_tarefa(self, tarefa):
+        self._pendentes[tarefa["match_id"]] = tarefa
+        execucao = asyncio.create_task(self._executar(tarefa))
+        self._em_execucao.add(execucao)
+        execucao.add_done_callback(self._em_execucao.discard)
+
+    async def _executar(self, tarefa):
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.concorrencia)
+        async with self._semaforo:
+            try:
+                await self._executores[tarefa["tipo"]](tarefa)
+            except Exception as e:
+                print(f"Erro na tarefa {tarefa['tipo']} da partida {tarefa['match_id']}: {e}")
+            finally:
+                # O executor trata as próprias falhas; daqui em diante a tarefa não é mais retomada
+                await self._banco("DELETE FROM tarefas_pendentes WHERE id = ?", (tarefa["id"],))
+                self._pendentes.pop(tarefa["match_id"], None)
+
+    async def aguardar(self):
+        """Espera todas as tarefas agendadas terminarem"""
+        while self._em_execucao:
+            await asyncio.gather(*self._em_execucao, return_exceptions=True)
+
+    def __len__(self):
+        return len(self._pendentes)
@@ -0,0 +1,80 @@
+# Testes com o backend SQLite em memória: python -m pytest tests
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+import pytest
+
+def pytest_configure(config):
+    # Os testes usam o backend SQLite em memória; journal e tarefas ficam em uma pasta temporária.
+    # As variáveis precisam existir antes de `config` ser importado, e ficam fora do nível do
+    # módulo para que o benchmark possa importar os objetos falsos daqui sem mexer no ambiente.
+    pasta = tempfile.mkdtemp(prefix="botcc-testes-")
+    os.environ["DATABASE_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = ":memory:"
+    os.environ["JOURNAL_PATH"] = os.path.join(pasta, "apostas_pendentes.db")
+    os.environ["TAREFAS_PATH"] = os.path.join(pasta, "tarefas_pendentes.db")
+    os.environ["CHECKPOINT_INTERVALO"] = "0"
+    os.environ["METRICAS_PORTA"] = "0"
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class MensagemFalsa:
+    def __init__(self, **conteudo):
+        self.id = id(self)
+        self.conteudo = conteudo
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def edit(self, **conteudo):
+        self.conteudo.update(conteudo)
+
+    async def delete(self):
+        pass
+
+class ContextoFalso:
+    """O mínimo de `commands.Context` que os comandos usam (nos testes e no benchmark.py)"""
+
+    def __init__(self, user_id, guild_id=None, administrador=False):
+        self.author = SimpleNamespace(
+            id=user_id,
+            name=f"usuario{user_id}",
+            display_name=f"Usuário {user_id}",
+            mention=f"<@{user_id}>",
+            display_avatar=SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png"),
+            guild_permissions=SimpleNamespace(administrator=administrador)
+        )
+        self.guild = SimpleNamespace(id=guild_id)
+        self.channel = SimpleNamespace(id=1, mention="#apostas", send=self.send)
+        self.message = MensagemFalsa()
+        self.respostas = []
+
+    async def send(self, *args, **kwargs):
+        mensagem = MensagemFalsa(args=args, **kwargs)
+        self.respostas.append(mensagem)
+        return mensagem
+
+def _fechar(loop):
+    """Cancela as tarefas de segundo plano (envio da fila, tarefas de partida...) e fecha o loop"""
+    pendentes = asyncio.all_tasks(loop)
+    for tarefa in pendentes:
+        tarefa.cancel()
+    if pendentes:
+        loop.run_until_complete(asyncio.gather(*pendentes, return_exceptions=True))
+    loop.close()
+
+@pytest.fixture
+def rodar():
+    """Executa corrotinas em um event loop novo, fechado ao fim do teste"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    _fechar(loop)
+
+@pytest.fixture(scope="module")
+def rodar_modulo():
+    """Event loop compartilhado pelos testes de um módulo (para objetos globais, como os de main.py)"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    _fechar(loop)
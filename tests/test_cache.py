@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+
+from cache import Coalescedor
+
+class Leitura:
+    """Leitura falsa do banco que só termina quando `liberar` é chamado"""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.valor = 0
+        self.pronta = asyncio.Event()
+
+    async def __call__(self, chave):
+        self.chamadas += 1
+        valor = self.valor
+        await self.pronta.wait()
+        return (chave, valor)
+
+    async def iniciada(self, chamadas):
+        while self.chamadas < chamadas:
+            await asyncio.sleep(0)
+
+def test_leituras_simultaneas_viram_uma_consulta(rodar):
+    async def cenario():
+        leitura = Leitura()
+        coalescedor = Coalescedor()
+        pendentes = [asyncio.ensure_future(coalescedor.executar("k", leitura, "k")) for _ in range(5)]
+        await leitura.iniciada(1)
+        leitura.pronta.set()
+        assert await asyncio.gather(*pendentes) == [("k", 0)] * 5
+        assert leitura.chamadas == 1
+
+        # Sem janela, uma leitura depois da anterior terminar vai ao banco de novo
+        await coalescedor.executar("k", leitura, "k")
+        assert leitura.chamadas == 2
+    rodar(cenario())
+
+def test_limpar_descarta_a_leitura_em_andamento_e_a_janela(rodar):
+    async def cenario():
+        leitura = Leitura()
+        coalescedor = Coalescedor(janela=60)
+        antiga = asyncio.ensure_future(coalescedor.executar("k", leitura, "k"))
+        await leitura.iniciada(1)
+
+        # Uma escrita muda os dados enquanto a leitura antiga ainda está em andamento
+        leitura.valor = 1
+        coalescedor.limpar()
+        nova = asyncio.ensure_future(coalescedor.executar("k", leitura, "k"))
+        await leitura.iniciada(2)
+        leitura.pronta.set()
+        assert await antiga == ("k", 0)
+        assert await nova == ("k", 1)
+        assert leitura.chamadas == 2
+
+        # O resultado guardado na janela é o da leitura feita depois de limpar
+        assert await coalescedor.executar("k", leitura, "k") == ("k", 1)
+        assert leitura.chamadas == 2
+
+        coalescedor.limpar()
+        assert await coalescedor.executar("k", leitura, "k") == ("k", 1)
+        assert leitura.chamadas == 3
+    rodar(cenario())
+
+def test_erro_nao_fica_guardado_na_janela(rodar):
+    async def cenario():
+        chamadas = []
+
+        async def falhar_uma_vez(chave):
+            chamadas.append(chave)
+            if len(chamadas) == 1:
+                raise RuntimeError("banco fora do ar")
+            return chave
+
+        coalescedor = Coalescedor(janela=60)
+        with pytest.raises(RuntimeError):
+            await coalescedor.executar("k", falhar_uma_vez, "k")
+        assert await coalescedor.executar("k", falhar_uma_vez, "k") == "k"
+        assert len(chamadas) == 2
+    rodar(cenario())
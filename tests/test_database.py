@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("sortedcontainers")
+
+from backends.sqlite_backend import SQLiteBackend
+from database import Database
+
+def criar_db():
+    return Database(SQLiteBackend(":memory:"))
+
+async def partida_com_aposta(db, user_id=1, valor=1000, multiplicador=1.5):
+    await db.registrar_usuario(user_id, f"usuario{user_id}")
+    match_id = await db.registrar_partida("TimeA", "TimeB")
+    resultados = await db.registrar_apostas_lote([{
+        "id_cliente": f"aposta-{user_id}-{match_id}",
+        "user_id": user_id,
+        "match_id": match_id,
+        "time": "TimeA",
+        "valor": valor,
+        "multiplicador": multiplicador
+    }])
+    assert resultados[0]["saldo"] == 5000 - valor
+    return match_id
+
+def test_liquidar_partida_com_usuario_fora_do_cache(rodar):
+    async def cenario():
+        db = criar_db()
+        match_id = await partida_com_aposta(db)
+        # Simula a expiração do cache de usuários entre a aposta e a liquidação
+        db._usuarios.remover(1)
+
+        resultado = await db.liquidar_partida(match_id, "TimeA")
+        assert resultado is not None
+        assert resultado["total_pago"] == 1500
+        assert await db.get_saldo(1) == 5500
+        assert (await db.get_partida(match_id))["finalizada"]
+    rodar(cenario())
+
+def test_cancelar_partida_com_usuario_fora_do_cache(rodar):
+    async def cenario():
+        db = criar_db()
+        match_id = await partida_com_aposta(db)
+        db._usuarios.remover(1)
+
+        assert await db.cancelar_partida(match_id)
+        assert await db.get_saldo(1) == 5000
+        assert await db.get_partida(match_id) is None
+    rodar(cenario())
+
+def test_partida_liquidada_nao_pode_ser_cancelada(rodar):
+    async def cenario():
+        db = criar_db()
+        match_id = await partida_com_aposta(db)
+        await db.liquidar_partida(match_id, "TimeA")
+
+        assert not await db.cancelar_partida(match_id)
+        assert await db.get_saldo(1) == 5500
+    rodar(cenario())
+
+def test_leitura_em_andamento_nao_guarda_saldo_anterior_a_alteracao(rodar):
+    async def cenario():
+        db = criar_db()
+        await db.registrar_usuario(1, "usuario1")
+        db._usuarios.remover(1)
+
+        leitura = asyncio.ensure_future(db.get_saldo(1))
+        await asyncio.sleep(0)
+        # O banco devolve um saldo novo enquanto a leitura ainda não terminou
+        db._saldo_alterado(1, 4200)
+
+        assert await leitura == 4200
+        assert await db.get_saldo(1) == 4200
+    rodar(cenario())
+
+def test_resgate_com_erro_no_banco_nao_parece_resgate_repetido(rodar):
+    async def cenario():
+        db = criar_db()
+        await db.registrar_usuario(1, "usuario1")
+        assert await db.resgatar_diario(1) == 6000
+        assert await db.resgatar_diario(1) is None
+
+        async def falhar(*args):
+            raise RuntimeError("banco fora do ar")
+        db.backend.resgatar_diario = falhar
+        assert await db.resgatar_diario(2) is False
+    rodar(cenario())
+
+def test_historico_guarda_so_as_partidas_mais_recentes(rodar):
+    async def cenario():
+        db = criar_db()
+        db.historico.tamanho_maximo = 5
+        for numero in range(8):
+            match_id = await db.registrar_partida(f"Casa{numero}", f"Fora{numero}")
+            await db.liquidar_partida(match_id, f"Casa{numero}")
+
+        primeira = await db.get_historico_partidas(3)
+        segunda = await db.get_historico_partidas(3, primeira[-1]["id"])
+        terceira = await db.get_historico_partidas(3, segunda[-1]["id"])
+        assert [partida["id"] for partida in primeira + segunda + terceira] == list(range(8, 0, -1))
+        assert len(db.historico) == 5
+
+        # A página mais recente sai da memória; a mais antiga volta a ser lida do banco
+        assert db.historico.pagina(3) == primeira
+        assert db.historico.pagina(3, segunda[-1]["id"]) is None
+        assert await db.get_historico_partidas(3, segunda[-1]["id"]) == terceira
+
+        # Uma partida liquidada depois entra na janela, que continua limitada
+        match_id = await db.registrar_partida("Nova1", "Nova2")
+        await db.liquidar_partida(match_id, "Nova1")
+        assert db.historico.get(match_id) is not None
+        assert len(db.historico) == 5
+    rodar(cenario())
@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("sortedcontainers")
+
+from backends.sqlite_backend import SQLiteBackend
+from database import Database
+from fila_apostas import FilaApostas
+
+async def preparar(db):
+    await db.registrar_usuario(1, "usuario1")
+    return await db.registrar_partida("TimeA", "TimeB")
+
+def test_esvaziar_grava_as_apostas_e_libera_a_reserva(rodar, tmp_path):
+    async def cenario():
+        db = Database(SQLiteBackend(":memory:"))
+        match_id = await preparar(db)
+        fila = FilaApostas(db, str(tmp_path / "journal.db"))
+
+        await fila.enfileirar(1, match_id, "TimeA", 100, 2.0)
+        await fila.enfileirar(1, match_id, "TimeB", 50, 2.0)
+        assert fila.reservado(1) == 150
+        # Saldo em cache de um usuário que expirou do cache antes do envio
+        db._usuarios.remover(1)
+
+        assert await fila.esvaziar()
+        assert len(fila) == 0
+        assert fila.reservado(1) == 0
+        assert await db.get_saldo(1) == 4850
+        assert not await fila._journal("SELECT * FROM apostas_pendentes")
+    rodar(cenario())
+
+def test_apostas_do_journal_sao_reenviadas_uma_unica_vez(rodar, tmp_path):
+    caminho = str(tmp_path / "journal.db")
+
+    async def cenario():
+        db = Database(SQLiteBackend(":memory:"))
+        match_id = await preparar(db)
+
+        fila = FilaApostas(db, caminho)
+        aposta = await fila.enfileirar(1, match_id, "TimeA", 100, 2.0)
+        await fila.enfileirar(1, match_id, "TimeA", 200, 2.0)
+        # O primeiro envio chegou ao servidor, mas o bot caiu antes de limpar o journal
+        await db.registrar_apostas_lote([aposta])
+
+        reiniciada = FilaApostas(db, caminho)
+        await reiniciada.iniciar()
+        assert len(reiniciada) == 0
+        assert await db.get_saldo(1) == 4700
+        assert len(await db.get_minhas_apostas(1)) == 2
+    rodar(cenario())
+
+def test_aposta_recusada_avisa_e_libera_a_reserva(rodar, tmp_path):
+    async def cenario():
+        db = Database(SQLiteBackend(":memory:"))
+        match_id = await preparar(db)
+        fila = FilaApostas(db, str(tmp_path / "journal.db"))
+        recusadas = []
+        fila.ao_rejeitar = recusadas.append
+
+        await fila.enfileirar(1, match_id, "TimeA", 100, 2.0, canal_id=42)
+        await db.liquidar_partida(match_id, "TimeB")
+
+        assert await fila.esvaziar()
+        assert [(aposta["valor"], aposta["canal_id"]) for aposta in recusadas] == [(100, 42)]
+        assert fila.reservado(1) == 0
+        assert await db.get_saldo(1) == 5000
+    rodar(cenario())
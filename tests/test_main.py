@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("sortedcontainers")
+pytest.importorskip("nextcord")
+import main
+from conftest import ContextoFalso
+
+@pytest.fixture(scope="module")
+def rodar_main(rodar_modulo):
+    """Loop do módulo com a carga inicial do bot já feita"""
+    rodar_modulo(main.on_ready())
+    return rodar_modulo
+
+async def nova_partida(time1, time2):
+    match_id = await main.sb.registrar_partida(time1, time2)
+    main.registrar_partida_em_memoria(match_id, time1, time2)
+    return match_id
+
+def test_on_ready_repetido_preserva_o_bolao_em_memoria(rodar_main):
+    async def cenario():
+        await main.sb.registrar_usuario(10, "usuario10")
+        match_id = await nova_partida("Reconexao1", "Reconexao2")
+
+        await main.apostar.callback(ContextoFalso(10), match_id, "Reconexao1", 300)
+        partida = main.matches[match_id]
+        partida.finalizado = True
+
+        # Reconexão ao gateway: o nextcord chama on_ready de novo
+        await main.on_ready()
+
+        assert main.matches[match_id] is partida
+        assert partida.finalizado
+        assert partida.total("Reconexao1") == 300
+        assert main.fila_apostas.reservado(10) == 300
+    rodar_main(cenario())
+
+def test_finalizar_partida_paga_em_segundo_plano(rodar_main):
+    async def cenario():
+        await main.sb.registrar_usuario(20, "usuario20")
+        match_id = await nova_partida("Final1", "Final2")
+        await main.apostar.callback(ContextoFalso(20), match_id, "Final1", 1000)
+        # O apostador sai do cache antes da liquidação
+        main.sb._usuarios.remover(20)
+
+        ctx = ContextoFalso(1, administrador=True)
+        await main.finalizar_partida.callback(ctx, match_id, "Final1")
+        # A partida fecha para apostas assim que a tarefa é agendada
+        assert main.matches[match_id].finalizado
+        await main.tarefas.aguardar()
+
+        assert match_id not in main.matches
+        assert (await main.sb.get_partida(match_id))["vencedor"] == "Final1"
+        assert await main.sb.get_saldo(20) == 5000 - 1000 + int(1000 * 1.5)
+        # O embed de progresso termina com todas as etapas concluídas
+        progresso = ctx.respostas[0].conteudo["embed"].description
+        assert progresso.count("✅") == len(main.ETAPAS_TAREFA["liquidar"])
+    rodar_main(cenario())
+
+def test_on_ready_tenta_de_novo_depois_de_uma_falha(rodar_main, monkeypatch):
+    async def cenario():
+        await main.sb.registrar_usuario(30, "usuario30")
+        match_id = await nova_partida("Falha1", "Falha2")
+        await main.apostar.callback(ContextoFalso(30), match_id, "Falha1", 200)
+
+        carregar_configuracoes = main.sb.carregar_configuracoes
+        async def falhar_uma_vez():
+            monkeypatch.setattr(main.sb, "carregar_configuracoes", carregar_configuracoes)
+            raise RuntimeError("banco fora do ar")
+        monkeypatch.setattr(main.sb, "carregar_configuracoes", falhar_uma_vez)
+        # Simula a primeira carga, interrompida pela falha
+        monkeypatch.setattr(main, "carregado", False)
+
+        with pytest.raises(RuntimeError):
+            await main.on_ready()
+        assert not main.carregado
+
+        await main.on_ready()
+        assert main.carregado
+        assert main.matches[match_id].total("Falha1") == 200
+    rodar_main(cenario())
+
+def test_finalizar_e_cancelar_ao_mesmo_tempo_agendam_uma_unica_tarefa(rodar_main, monkeypatch):
+    async def cenario():
+        match_id = await nova_partida("Disputa1", "Disputa2")
+        partida = main.matches[match_id]
+
+        class ContextoLento(ContextoFalso):
+            async def send(self, *args, **kwargs):
+                # Um envio lento ao Discord: o cancelamento chega enquanto este ainda não terminou
+                await asyncio.sleep(0.05)
+                return await super().send(*args, **kwargs)
+
+        async def confirmar(*args, **kwargs):
+            await asyncio.sleep(0)
+            return SimpleNamespace(emoji="✅"), None
+        monkeypatch.setattr(main.bot, "wait_for", confirmar)
+
+        finalizar = ContextoLento(1, administrador=True)
+        cancelar = ContextoFalso(1, administrador=True)
+        await asyncio.gather(
+            main.finalizar_partida.callback(finalizar, match_id, "Disputa1"),
+            main.cancelar_partida.callback(cancelar, match_id)
+        )
+        # A partida segue fechada enquanto a tarefa vencedora roda
+        assert partida.finalizado
+        assert main.tarefas.pendente(match_id)
+        avisos = [resposta.conteudo.get("args") for resposta in finalizar.respostas + cancelar.respostas]
+        assert ("A partida {} já está sendo finalizada ou cancelada.".format(match_id),) in avisos
+
+        await main.tarefas.aguardar()
+        assert match_id not in main.matches
+    rodar_main(cenario())
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("nextcord")
+
+from mensageiro import agrupar_linhas, EMBEDS_POR_MENSAGEM, LIMITE_DESCRICAO, LIMITE_MENSAGEM, RESERVA_RODAPE
+
+def conferir_limites(titulo, mensagens):
+    for descricoes in mensagens:
+        assert 0 < len(descricoes) <= EMBEDS_POR_MENSAGEM
+        assert all(len(descricao) <= LIMITE_DESCRICAO for descricao in descricoes)
+        assert sum(len(titulo) + RESERVA_RODAPE + len(descricao) for descricao in descricoes) <= LIMITE_MENSAGEM
+
+def juntar(mensagens):
+    return [linha for descricoes in mensagens for descricao in descricoes for linha in descricao.split("\n")]
+
+def test_linhas_sao_divididas_dentro_dos_limites_do_discord():
+    titulo = "Apostas da partida"
+    linhas = [f"<@{i}> apostou {i * 37 % 1000} moedas em Time{i % 3}" * (1 + i % 7) for i in range(2000)]
+    mensagens = agrupar_linhas(titulo, linhas)
+    assert len(mensagens) > 1
+    conferir_limites(titulo, mensagens)
+    assert juntar(mensagens) == linhas
+
+def test_linha_maior_que_uma_descricao_e_cortada():
+    titulo = "Resultado"
+    linhas = ["a" * 5000, "b" * 4000, "c"]
+    mensagens = agrupar_linhas(titulo, linhas)
+    conferir_limites(titulo, mensagens)
+    # Duas descrições cheias não cabem nos 6000 caracteres de uma mensagem
+    assert mensagens == [["a" * LIMITE_DESCRICAO], ["b" * 4000 + "\nc"]]
+
+def test_descricao_que_sobra_na_mensagem_e_aproveitada():
+    titulo = "T"
+    linhas = ["x" * 3000, "y" * 2000, "z" * 900]
+    mensagens = agrupar_linhas(titulo, linhas)
+    conferir_limites(titulo, mensagens)
+    assert mensagens == [["x" * 3000, "y" * 2000 + "\n" + "z" * 900]]
+
+def test_sem_linhas_nao_ha_mensagens():
+    assert agrupar_linhas("T", []) == []
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("nextcord")
+
+from conftest import ContextoFalso
+from paginacao import Paginador
+
+class Interacao:
+    def __init__(self, user_id):
+        self.user = SimpleNamespace(id=user_id)
+        self.edicoes = []
+        self.response = SimpleNamespace(edit_message=self.edit_message)
+
+    async def edit_message(self, **conteudo):
+        self.edicoes.append(conteudo)
+
+def criar_paginador(total, tamanho_pagina):
+    buscas = []
+
+    async def buscar(limite, antes_de):
+        buscas.append((limite, antes_de))
+        return [{"id": i} for i in range(total if antes_de is None else antes_de - 1, 0, -1)][:limite]
+
+    def montar_embed(itens, pagina):
+        return {"pagina": pagina, "ids": [item["id"] for item in itens]}
+
+    return Paginador(7, buscar, montar_embed, tamanho_pagina), buscas
+
+def test_paginas_sao_buscadas_pelo_cursor_e_voltam_pelos_anteriores(rodar):
+    async def cenario():
+        paginador, buscas = criar_paginador(7, 3)
+        ctx = ContextoFalso(7)
+        assert await paginador.enviar(ctx)
+        assert ctx.respostas[0].conteudo["embed"] == {"pagina": 1, "ids": [7, 6, 5]}
+        assert paginador.anterior.disabled and not paginador.proxima.disabled
+
+        interacao = Interacao(7)
+        assert await paginador.interaction_check(interacao)
+        assert not await paginador.interaction_check(Interacao(8))
+
+        await paginador.proxima.callback(interacao)
+        assert interacao.edicoes[-1]["embed"] == {"pagina": 2, "ids": [4, 3, 2]}
+        await paginador.proxima.callback(interacao)
+        assert interacao.edicoes[-1]["embed"] == {"pagina": 3, "ids": [1]}
+        assert not paginador.anterior.disabled and paginador.proxima.disabled
+
+        await paginador.anterior.callback(interacao)
+        assert interacao.edicoes[-1]["embed"] == {"pagina": 2, "ids": [4, 3, 2]}
+        await paginador.anterior.callback(interacao)
+        assert interacao.edicoes[-1]["embed"] == {"pagina": 1, "ids": [7, 6, 5]}
+        assert paginador.anterior.disabled and not paginador.proxima.disabled
+
+        # Cada página pede um item a mais, a partir do menor id da página anterior
+        assert buscas == [(4, None), (4, 5), (4, 2), (4, 5), (4, None)]
+    rodar(cenario())
+
+def test_uma_pagina_so_e_enviada_sem_botoes(rodar):
+    async def cenario():
+        paginador, buscas = criar_paginador(3, 3)
+        ctx = ContextoFalso(7)
+        assert await paginador.enviar(ctx)
+        assert ctx.respostas[0].conteudo == {"args": (), "embed": {"pagina": 1, "ids": [3, 2, 1]}}
+        assert paginador.mensagem is None
+
+        vazio, _ = criar_paginador(0, 3)
+        assert not await vazio.enviar(ctx)
+        assert len(ctx.respostas) == 1
+    rodar(cenario())
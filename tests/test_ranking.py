@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("sortedcontainers")
+
+from ranking import Ranking
+
+def criar_ranking():
+    ranking = Ranking()
+    ranking.carregar([
+        {"id": 3, "nome": "c", "saldo": 500},
+        {"id": 1, "nome": "a", "saldo": 500},
+        {"id": 2, "nome": "b", "saldo": 900},
+        {"id": 4, "nome": "d", "saldo": 100}
+    ])
+    return ranking
+
+def test_empates_ficam_na_ordem_do_menor_id():
+    ranking = criar_ranking()
+    assert [usuario["id"] for usuario in ranking.top(10)] == [2, 1, 3, 4]
+    assert ranking.top(2) == [{"id": 2, "nome": "b", "saldo": 900}, {"id": 1, "nome": "a", "saldo": 500}]
+    assert ranking.posicao(1) == (2, 500)
+    assert ranking.posicao(3) == (3, 500)
+    assert ranking.posicao(99) is None
+
+def test_posicao_acompanha_os_saldos_atualizados():
+    ranking = criar_ranking()
+    ranking.atualizar(4, 500)
+    # Empata com 1 e 3 e fica depois deles, mas antes de nenhum outro
+    assert [usuario["id"] for usuario in ranking.top(10)] == [2, 1, 3, 4]
+    assert ranking.posicao(4) == (4, 500)
+
+    ranking.atualizar(3, 1000)
+    ranking.atualizar(5, 500, "e")
+    ranking.atualizar(2, None)
+    assert [usuario["id"] for usuario in ranking.top(10)] == [3, 2, 1, 4, 5]
+    assert ranking.top(1) == [{"id": 3, "nome": "c", "saldo": 1000}]
+    assert [ranking.posicao(user_id)[0] for user_id in (3, 2, 1, 4, 5)] == [1, 2, 3, 4, 5]
+    assert len(ranking) == 5
@@ -0,0 +1,18 @@
+import pathlib
+import pytest
+
+pglast = pytest.importorskip("pglast")
+
+SQL = pathlib.Path(__file__).resolve().parent.parent / "sql" / "supabase.sql"
+
+def test_script_do_supabase_e_sql_valido():
+    # O SQL Editor para no primeiro erro; tudo o que vem depois dele não seria criado
+    comandos = pglast.parse_sql(SQL.read_text(encoding="utf-8"))
+    assert comandos
+
+def test_corpos_plpgsql_sao_validos():
+    # O corpo das funções plpgsql é texto para o parser SQL; só é verificado ao ser compilado
+    funcoes = [comando for comando in pglast.split(SQL.read_text(encoding="utf-8")) if "language plpgsql" in comando]
+    assert funcoes
+    for funcao in funcoes:
+        pglast.parse_plpgsql(funcao)
@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("dotenv")
+
+from tarefas import TarefasPartidas
+
+def test_tarefa_interrompida_e_retomada_depois_do_reinicio(rodar, tmp_path):
+    caminho = str(tmp_path / "tarefas.db")
+
+    async def cenario():
+        antes = TarefasPartidas(caminho)
+        # O bot cai no meio da liquidação: a tarefa nunca termina neste processo
+        antes.registrar("finalizar", lambda tarefa: asyncio.Event().wait())
+        assert antes.reservar(1)
+        assert not antes.reservar(1)
+        await antes.agendar("finalizar", 1, "TimeA", SimpleNamespace(id=5), SimpleNamespace(id=9))
+        assert antes.reservar(2)
+        antes.liberar(2)
+        assert not antes.pendente(2)
+
+        depois = TarefasPartidas(caminho)
+        executadas = []
+
+        async def finalizar(tarefa):
+            executadas.append(tarefa)
+
+        depois.registrar("finalizar", finalizar)
+        retomadas = await depois.iniciar()
+        assert depois.pendente(1)
+        await depois.aguardar()
+
+        assert executadas == retomadas
+        assert [(t["tipo"], t["match_id"], t["vencedor"], t["canal_id"], t["mensagem_id"], t["retomada"])
+                for t in executadas] == [("finalizar", 1, "TimeA", 5, 9, True)]
+        assert not depois.pendente(1)
+        assert not depois._conn.execute("SELECT * FROM tarefas_pendentes").fetchall()
+
+        # Sem tarefas pendentes, um novo reinício não retoma nada
+        assert await TarefasPartidas(caminho).iniciar() == []
+    rodar(cenario())